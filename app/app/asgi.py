@@ -0,0 +1,22 @@
+"""
+ASGI config for app project.
+
+Django 2.2 has no ASGI handler, so the WSGI application is adapted with
+asgiref and every request still runs in a thread. Serve it with an ASGI
+worker, e.g.
+
+    WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        gunicorn -c gunicorn.conf.py app.asgi:application
+
+which needs the asgiref and uvicorn packages.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from asgiref.wsgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
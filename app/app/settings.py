@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -46,7 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.throttling.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,20 +82,110 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them
+# after each request) and, when DB_CONN_HEALTH_CHECKS is on, pinged before
+# the first query of each request that reuses one, see core.postgresql.
+# Behind pgbouncer in transaction pooling mode set DB_PGBOUNCER, which
+# disables the server side cursors the pooler cannot keep across
+# transactions.
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '0') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS':
+            os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+    }
+}
+
+# Safe requests of the recipe API read from the replicas of
+# DB_REPLICA_HOSTS, a comma separated list of hosts sharing the
+# credentials of the primary. A user reads from the primary for
+# REPLICA_STICKY_SECONDS after a write, marked in REPLICA_STICKY_CACHE,
+# which has to be shared by the processes: the system checks warn about
+# a local memory cache.
+REPLICA_DATABASES = []
+for _number, _host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{_number}'] = dict(
+        DATABASES['default'],
+        HOST=_host.strip(),
+        TEST={'MIRROR': 'default'}
+    )
+    REPLICA_DATABASES.append(f'replica{_number}')
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+REPLICA_STICKY_CACHE = os.environ.get('REPLICA_STICKY_CACHE', 'default')
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Defaults to a per process local memory cache. Point CACHE_BACKEND and
+# CACHE_LOCATION at a shared backend such as Redis to share it between
+# workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+RECIPE_LIST_CACHE_ALIAS = os.environ.get('RECIPE_LIST_CACHE_ALIAS', 'default')
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_LIST_CACHE_TIMEOUT', 300)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
+# New passwords are hashed with PASSWORD_HASHER: 'pbkdf2' (no extra
+# dependency), 'argon2' (needs argon2-cffi) or 'bcrypt' (needs bcrypt).
+# Hashes made by the others or with other parameters still verify and are
+# upgraded on the next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS',
+                                                150000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST',
+                                                 19456))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM',
+                                                 1))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# Password checks run in a pool of PASSWORD_HASH_WORKERS threads per
+# process; logins waiting more than PASSWORD_HASH_WAIT seconds for one of
+# the PASSWORD_HASH_MAX_PENDING slots get a 503.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING',
+                                               16))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', 2))
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -133,3 +226,102 @@ STTATIC_ROOT = 'vol/web/static'
 MEDIA_ROOT = 'vol/web/media'
 
 AUTH_USER_MODEL='core.User'
+
+# Upper bound on the items of a bulk request and the rows per INSERT or
+# UPDATE statement the bulk endpoints issue.
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 5000))
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
+
+# Recipes read per server side cursor fetch by the export endpoint.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Records per transaction of recipe imports, and how many invalid records
+# an import reports.
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 100))
+
+# Uploaded recipe images are resized in a 'process' pool, a 'thread' pool
+# or 'sync' in the request (handy for tests and debugging).
+IMAGE_WORKER_MODE = os.environ.get('IMAGE_WORKER_MODE', 'process')
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 85))
+# Seconds after which the requeue_images command renders an image still
+# processing, its job lost with a recycled or crashed worker.
+IMAGE_JOB_TIMEOUT = int(os.environ.get('IMAGE_JOB_TIMEOUT', 600))
+
+# Resumable image uploads: the largest accepted file and how long an
+# unfinished upload session is kept before gc_images removes it.
+IMAGE_UPLOAD_MAX_SIZE = int(os.environ.get('IMAGE_UPLOAD_MAX_SIZE',
+                                           20 * 1024 * 1024))
+IMAGE_UPLOAD_SESSION_TTL = int(os.environ.get('IMAGE_UPLOAD_SESSION_TTL',
+                                              24 * 3600))
+
+# How /media/ files are delivered: 'django' streams them from the worker,
+# 'accel' hands them to nginx with X-Accel-Redirect to an internal
+# location aliased to MEDIA_ROOT, and 'sendfile' to Apache or lighttpd
+# with X-Sendfile. Names that are not content addressed are cached for
+# MEDIA_MAX_AGE seconds.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 3600))
+
+# Token -> user entries cached by CachedTokenAuthentication, for
+# TOKEN_AUTH_CACHE_TTL seconds. They live in TOKEN_AUTH_SHARED_CACHE, a
+# cache shared by all the processes (memcached, redis), so that a revoked
+# token or a deactivated user is rejected by every process at once. Set
+# TOKEN_AUTH_LOCAL_CACHE=1 instead to keep them in the process when a
+# single one serves the API. With neither, tokens are not cached.
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60))
+TOKEN_AUTH_SHARED_CACHE = os.environ.get('TOKEN_AUTH_SHARED_CACHE') or None
+TOKEN_AUTH_LOCAL_CACHE = os.environ.get('TOKEN_AUTH_LOCAL_CACHE', '0') == '1'
+
+# Token bucket budgets of core.throttling.ScopedBucketThrottle, per user or
+# per IP for anonymous requests, as '<burst>/<refill period>'. The buckets
+# live in the THROTTLE_CACHE alias, which defaults to the default cache
+# when that is shared by the processes (not local memory). Otherwise each
+# process keeps its own buckets and a client gets the budget once per
+# gunicorn worker (WEB_WORKERS).
+THROTTLE_RATES = {
+    'read': os.environ.get('THROTTLE_READ_RATE', '300/min'),
+    'write': os.environ.get('THROTTLE_WRITE_RATE', '60/min'),
+    'upload': os.environ.get('THROTTLE_UPLOAD_RATE', '600/hour'),
+    'login': os.environ.get('THROTTLE_LOGIN_RATE', '30/min'),
+}
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE') or (
+    None if CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    in ('LocMemCache', 'DummyCache') else 'default'
+)
+THROTTLE_LOCAL_MAX_KEYS = int(os.environ.get('THROTTLE_LOCAL_MAX_KEYS',
+                                             100000))
+
+# Text search configuration of the recipe search vectors. Changing it
+# needs the vectors to be recomputed with Recipe.objects.update_search().
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.RecipeCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.ScopedBucketThrottle'],
+    # encodes with orjson when installed, the same bytes as JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # proxies in front of the app, so that per IP throttling uses the
+    # client address of X-Forwarded-For rather than trusting all of it
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES'])
+    if os.environ.get('NUM_PROXIES') else None,
+}
+
+# Request metrics, served in the Prometheus format on /metrics to
+# scrapers sending METRICS_TOKEN as a bearer token, or to logged in staff
+# users while it is unset.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Thresholds of the slow query and slow request warnings, 0 to disable
+# them. Requests making more than SLOW_REQUEST_QUERIES queries are logged
+# too, to catch N+1 queries.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', 50))
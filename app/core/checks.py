@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+
+@register()
+def check_replica_sticky_cache(app_configs, **kwargs):
+    """Warn when the marker of recent writes is not shared by processes
+
+    A write then only sends the reads answered by the same gunicorn
+    worker to the primary, the others may miss it on a lagging replica.
+    """
+    if not settings.REPLICA_DATABASES or \
+            not isinstance(caches[settings.REPLICA_STICKY_CACHE],
+                           (LocMemCache, DummyCache)):
+        return []
+    return [Warning(
+        'REPLICA_STICKY_CACHE is not shared by the processes, users may '
+        'not read their own writes from the replicas.',
+        hint='Point REPLICA_STICKY_CACHE to a memcached or Redis cache.',
+        id='core.W001',
+    )]
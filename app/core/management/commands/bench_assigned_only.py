@@ -0,0 +1,120 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Recipe
+from recipe.filters import AssignedOnlyFilter
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded data at the end of a run"""
+
+
+class Command(BaseCommand):
+    """Benchmark the assigned_only tag query against a seeded dataset"""
+    help = 'Compare the JOIN + DISTINCT and semi-join assigned_only queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=10000)
+        parser.add_argument('--links', type=int, default=1000000)
+        parser.add_argument('--links-per-recipe', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='keep the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.seed(options)
+                self.compare(user, options['runs'])
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('seeded data rolled back')
+
+    def seed(self, options):
+        """Create a user with tags, recipes and recipe tag links"""
+        started = time.perf_counter()
+        user = get_user_model().objects.create_user(
+            f'bench-{time.time_ns()}@example.com'
+        )
+        Tag.objects.bulk_create(
+            (Tag(user=user, name=f'tag {i}') for i in range(options['tags'])),
+            batch_size=5000
+        )
+        per_recipe = options['links_per_recipe']
+        Recipe.objects.bulk_create(
+            (
+                Recipe(user=user, title=f'recipe {i}', time_minutes=10,
+                       price=5)
+                for i in range(options['links'] // per_recipe)
+            ),
+            batch_size=5000
+        )
+
+        # Only 80% of the tags get assigned so assigned_only filters
+        # something out. Each recipe gets per_recipe distinct tags spaced
+        # evenly across that pool.
+        pool = max(int(options['tags'] * 0.8), per_recipe)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO core_recipe_tags (recipe_id, tag_id) '
+                'SELECT r.id, t.id FROM '
+                '(SELECT id, row_number() OVER (ORDER BY id) - 1 AS n '
+                ' FROM core_recipe WHERE user_id = %s) r '
+                'CROSS JOIN generate_series(0, %s - 1) k '
+                'JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS n '
+                '      FROM core_tag WHERE user_id = %s) t '
+                'ON t.n = (r.n + k * (%s / %s)) %% %s',
+                [user.id, per_recipe, user.id, pool, per_recipe, pool]
+            )
+            cursor.execute('ANALYZE core_tag')
+            cursor.execute('ANALYZE core_recipe')
+            cursor.execute('ANALYZE core_recipe_tags')
+
+        self.stdout.write(
+            f'seeded {options["tags"]} tags and {options["links"]} links '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+        return user
+
+    def compare(self, user, runs):
+        """Print the plan and latency of the old and new queries"""
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        base = Tag.objects.filter(user=user).order_by('-name', '-id')
+        queries = (
+            ('join + distinct', base.filter(recipe__isnull=False).distinct()),
+            ('semi-join', AssignedOnlyFilter().filter_queryset(
+                Request(APIRequestFactory().get('/', {'assigned_only': 1})),
+                base,
+                None
+            )),
+        )
+        for label, queryset in queries:
+            for scope, query in (('page', queryset[:page_size + 1]),
+                                 ('full', queryset)):
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{label} ({scope})'
+                ))
+                self.stdout.write(query.explain(analyze=True))
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    list(query.all())
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                self.stdout.write(self.style.SUCCESS(
+                    f'median {statistics.median(timings):.2f}ms '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f}ms '
+                    f'over {runs} runs'
+                ))
@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer, orjson
+from recipe.rows import row_serializer
+from recipe.serializers import RecipeSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded data at the end of a run"""
+
+
+class Command(BaseCommand):
+    """Benchmark serializing recipe lists with and without the fast path"""
+    help = 'Compare ModelSerializer and RowSerializer time per 1,000 rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--links-per-recipe', type=int, default=3)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.seed(options)
+                self.compare(user, options['rows'], options['runs'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('seeded data rolled back')
+
+    def seed(self, options):
+        """Create a user with recipes linked to a few tags and ingredients"""
+        user = get_user_model().objects.create_user(
+            f'bench-{time.time_ns()}@example.com'
+        )
+        per_recipe = options['links_per_recipe']
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(per_recipe)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}')
+            for i in range(per_recipe)
+        )
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(user=user, title=f'recipe {i}', time_minutes=10,
+                       price='5.25', link='https://example.com')
+                for i in range(options['rows'])
+            ),
+            batch_size=5000
+        )
+        for field, related in (('tags', tags), ('ingredients', ingredients)):
+            through = getattr(Recipe, field).through
+            through.objects.bulk_create(
+                (
+                    through(recipe=recipe, **{field[:-1]: obj})
+                    for recipe in recipes for obj in related
+                ),
+                batch_size=5000
+            )
+        return user
+
+    def compare(self, user, count, runs):
+        """Print the median time per 1,000 rows of each path"""
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        fast = row_serializer(RecipeSerializer)
+
+        def model_path():
+            recipes = queryset.prefetch_related('tags', 'ingredients')
+            return RecipeSerializer(recipes, many=True).data
+
+        def row_path():
+            return fast.serialize(list(queryset.values(*fast.columns())))
+
+        model_data, row_data = model_path(), row_path()
+        # rendered as a page of the API, whose links are often null
+        page = {'next': None, 'previous': None, 'results': row_data}
+        if JSONRenderer().render(model_data) != \
+                JSONRenderer().render(row_data):
+            raise CommandError('the row serializer output differs')
+        paths = [
+            ('ModelSerializer', model_path),
+            ('RowSerializer', row_path),
+            ('JSONRenderer', lambda: JSONRenderer().render(page)),
+        ]
+        if orjson is None:
+            self.stdout.write('orjson is not installed, FastJSONRenderer '
+                              'falls back to JSONRenderer')
+        else:
+            paths.append(('FastJSONRenderer',
+                          lambda: FastJSONRenderer().render(page)))
+            if FastJSONRenderer().render(page) != \
+                    JSONRenderer().render(page):
+                raise CommandError('the orjson output differs')
+
+        for label, path in paths:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                path()
+                timings.append(time.perf_counter() - started)
+            per_thousand = statistics.median(timings) * 1000 * 1000 / count
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {per_thousand:.2f}ms per 1,000 rows, '
+                f'median over {runs} runs'
+            ))
@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RECIPE_IMAGE_DIR, ImageBlob, UploadSession, \
+                        recipe_image_storage
+
+
+class Command(BaseCommand):
+    """Delete the recipe image files no recipe references"""
+    help = ('Delete unreferenced files in the recipe image directory and '
+            'expired upload sessions')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help='only delete files untouched for this many seconds'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Walk the directory and delete the files without references
+
+        The grace period protects files written by uploads and image
+        workers whose references are not committed yet. Saving content
+        that already exists refreshes its modification time, so a file
+        being shared again is protected the same way.
+        """
+        cutoff = time.time() - options['grace']
+        filenames = []
+        if recipe_image_storage.exists(RECIPE_IMAGE_DIR):
+            filenames = recipe_image_storage.listdir(RECIPE_IMAGE_DIR)[1]
+        names = (
+            os.path.join(RECIPE_IMAGE_DIR, filename) for filename in filenames
+        )
+        deleted = freed = 0
+        while True:
+            batch = list(islice(names, options['batch_size']))
+            if not batch:
+                break
+            count, size = self.collect(batch, cutoff, options['dry_run'])
+            deleted += count
+            freed += size
+
+        expired = UploadSession.objects.filter(
+            created__lt=timezone.now() - timedelta(
+                seconds=settings.IMAGE_UPLOAD_SESSION_TTL
+            )
+        )
+        if options['dry_run']:
+            sessions = expired.count()
+        else:
+            sessions = expired.delete()[1].get(UploadSession._meta.label, 0)
+
+        verb = 'would delete' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} files ({freed} bytes) and {sessions} '
+            f'expired upload sessions'
+        ))
+
+    def collect(self, names, cutoff, dry_run):
+        """Delete the unreferenced files of a batch older than the cutoff"""
+        referenced = set(ImageBlob.objects.filter(
+            name__in=names,
+            references__gt=0
+        ).values_list('name', flat=True))
+        orphans, freed = [], 0
+        for name in names:
+            if name in referenced:
+                continue
+            try:
+                stat = os.stat(recipe_image_storage.path(name))
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime >= cutoff:
+                continue
+            if not dry_run:
+                recipe_image_storage.delete(name)
+            orphans.append(name)
+            freed += stat.st_size
+        if orphans and not dry_run:
+            ImageBlob.objects.filter(name__in=orphans, references=0).delete()
+        return len(orphans), freed
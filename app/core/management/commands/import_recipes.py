@@ -0,0 +1,51 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import PARSERS, RecipeImporter
+
+
+class Command(BaseCommand):
+    """Import recipes for a user from an NDJSON or CSV file"""
+    help = 'Import recipes from an NDJSON or CSV file, - reads stdin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--format', choices=sorted(PARSERS))
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'no user with email {options["email"]}')
+
+        path = options['path']
+        input_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        importer = RecipeImporter(user, options['batch_size'])
+
+        if path == '-':
+            result = self._import(importer, input_format, sys.stdin.buffer)
+        else:
+            with open(path, 'rb') as lines:
+                result = self._import(importer, input_format, lines)
+
+        for error in result.errors:
+            self.stderr.write(f'line {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'imported {result.imported} recipes, skipped {result.skipped} '
+            f'in {result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)'
+        ))
+
+    def _import(self, importer, input_format, lines):
+        return importer.run(
+            PARSERS[input_format](lines),
+            progress=lambda result: self.stdout.write(
+                f'{result.imported} recipes '
+                f'({result.rows_per_second:.0f} rows/s)'
+            )
+        )
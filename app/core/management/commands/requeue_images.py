@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe.images import render_image
+
+
+class Command(BaseCommand):
+    """Render the recipe images whose jobs were lost"""
+    help = ('Render the variants of recipe images processing for too long, '
+            'and mark those processing for much too long as failed')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale',
+            type=int,
+            default=settings.IMAGE_JOB_TIMEOUT,
+            help='render images queued this many seconds ago'
+        )
+        parser.add_argument(
+            '--give-up',
+            type=int,
+            default=24 * 3600,
+            help='mark images queued this many seconds ago as failed'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Render the stale jobs in this process, one at a time
+
+        A job is lost when the worker holding it is recycled or crashes
+        before it finishes. Rendering it again is harmless if it was only
+        slow. The queue time is kept, so an image that keeps crashing its
+        worker is eventually marked as failed.
+        """
+        now = timezone.now()
+        processing = Recipe.objects.filter(
+            image_status=Recipe.IMAGE_PROCESSING
+        )
+        give_up = now - timedelta(seconds=options['give_up'])
+        expired = processing.filter(image_queued__lt=give_up)
+        stale = processing.exclude(image_queued__lt=give_up).filter(
+            Q(image_queued__isnull=True) |
+            Q(image_queued__lt=now - timedelta(seconds=options['stale']))
+        ).values_list('pk', 'image')
+
+        if options['dry_run']:
+            failed = expired.count()
+            rendered = stale.count()
+        else:
+            failed = expired.touch(image_status=Recipe.IMAGE_FAILED)
+            rendered = 0
+            for pk, name in list(stale):
+                render_image(pk, name)
+                rendered += 1
+
+        verb = 'would render' if options['dry_run'] else 'rendered'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {rendered} images and marked {failed} as failed'
+        ))
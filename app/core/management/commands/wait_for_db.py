@@ -2,18 +2,38 @@ import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """command to wait the execution util db is available"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='give up after this many seconds, 0 waits forever'
+        )
+        parser.add_argument('--max-delay', type=float, default=5)
+
     def handle(self, *args, **options):
+        """Open a connection, retrying with an exponential backoff"""
         self.stdout.write('waiting for db...')
-        conn = None
-        while not conn:
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                conn = connections['default']
-            except OperationalError:
-                self.stdout.write('database unavailable waiting 1 second...')
-                time.sleep(1)
+                connection.ensure_connection()
+                break
+            except OperationalError as exc:
+                if options['timeout'] and time.monotonic() >= deadline:
+                    raise CommandError(f'database unavailable: {exc}')
+                self.stdout.write(
+                    f'database unavailable, waiting {delay:g} seconds...'
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, options['max_delay'])
         self.stdout.write(self.style.SUCCESS('database available!'))
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Prometheus histogram of the requests of each view and action
+
+    Observations are kept in this process only: every gunicorn worker
+    keeps its own counts, and a scrape reads those of the worker that
+    answers it.
+    """
+    labels = ('view', 'action')
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        """Count a value in the series of a (view, action) pair"""
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def expose(self):
+        """Return the lines of the Prometheus text format"""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = sorted(
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self.series.items()
+            )
+        bounds = [_format_number(bound) for bound in self.buckets]
+        bounds.append('+Inf')
+        for labels, counts, total, count in series:
+            pairs = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labels, labels)
+            )
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{pairs},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(
+                f'{self.name}_sum{{{pairs}}} {_format_number(total)}'
+            )
+            lines.append(f'{self.name}_count{{{pairs}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time to produce the response of a request.',
+    LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries made by a request.',
+    QUERY_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries by a request.',
+    LATENCY_BUCKETS
+)
+REQUEST_SERIALIZER_TIME = Histogram(
+    'http_request_serializer_duration_seconds',
+    'Time spent serializing and rendering the data of a request.',
+    LATENCY_BUCKETS
+)
+HISTOGRAMS = (
+    REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME,
+    REQUEST_SERIALIZER_TIME,
+)
+
+
+def render_metrics():
+    """Return all the histograms in the Prometheus text format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Queries, database time and serializer time of the current request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper timing queries, logging slow ones"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            threshold = settings.SLOW_QUERY_MS
+            if threshold and elapsed * 1000 >= threshold:
+                # without the parameters, which may hold personal data
+                logger.warning(
+                    'Slow query on %s (%.1fms): %s',
+                    context['connection'].alias, elapsed * 1000, sql
+                )
+
+
+@contextmanager
+def serializing():
+    """Count the time of a block as serializer time of the request
+
+    Nested blocks, like the nested serializers of a representation, are
+    only counted once.
+    """
+    stats = getattr(_local, 'stats', None)
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - started
+        stats.serializing = False
+
+
+class TimedSerializerMixin:
+    """Count building representations as serializer time of the request"""
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
+
+
+class MetricsMiddleware:
+    """Record the latency, queries and serializer time of every request
+
+    The series are labelled by the DRF view class and action that handled
+    the request. A streamed response is only timed until its first byte.
+    Requests over SLOW_REQUEST_MS or making more than SLOW_REQUEST_QUERIES
+    queries are logged, the latter usually being N+1 queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = _local.stats = RequestStats()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        self.record(
+            request,
+            getattr(request, 'metrics_labels', ('none', 'none')),
+            stats,
+            time.perf_counter() - started
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        method = request.method.lower()
+        request.metrics_labels = (
+            getattr(view, '__name__', type(view).__name__),
+            actions.get(method, method)
+        )
+
+    def record(self, request, labels, stats, elapsed):
+        REQUEST_LATENCY.observe(labels, elapsed)
+        REQUEST_QUERIES.observe(labels, stats.queries)
+        REQUEST_DB_TIME.observe(labels, stats.db_time)
+        REQUEST_SERIALIZER_TIME.observe(labels, stats.serializer_time)
+
+        slow = settings.SLOW_REQUEST_MS
+        max_queries = settings.SLOW_REQUEST_QUERIES
+        if (slow and elapsed * 1000 >= slow) or \
+                (max_queries and stats.queries > max_queries):
+            logger.warning(
+                'Slow request %s %s (%s.%s): %.1fms, %d queries in %.1fms, '
+                '%.1fms serializing',
+                request.method, request.path, *labels, elapsed * 1000,
+                stats.queries, stats.db_time * 1000,
+                stats.serializer_time * 1000
+            )
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Covering indexes for filtering recipes by tag and ingredient ids
+
+    The auto-created through tables only have a (recipe_id, x_id) unique
+    index and single column indexes, so semi-joins driven by the tag or
+    ingredient id have to visit the heap for every link.
+    """
+
+    dependencies = [
+        ('core', '0007_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX core_recipe_tags_tag_recipe_idx '
+                'ON core_recipe_tags (tag_id, recipe_id)',
+            reverse_sql='DROP INDEX core_recipe_tags_tag_recipe_idx',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX core_recipe_ingr_ingr_recipe_idx '
+                'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            reverse_sql='DROP INDEX core_recipe_ingr_ingr_recipe_idx',
+        ),
+    ]
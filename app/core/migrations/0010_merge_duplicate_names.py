@@ -0,0 +1,53 @@
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients whose names only differ by case
+
+    The oldest object of each (user, lower(name)) group is kept and the
+    recipe links of the others are moved to it before they are deleted.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = f'{model_name.lower()}_id'
+
+        by_lower_name = model.objects.annotate(lower_name=Lower('name'))
+        groups = by_lower_name.values('user_id', 'lower_name').annotate(
+            keep=Min('id'),
+            count=Count('id')
+        ).filter(count__gt=1)
+
+        for group in groups.iterator():
+            duplicates = by_lower_name.filter(
+                user_id=group['user_id'],
+                lower_name=group['lower_name']
+            ).exclude(id=group['keep'])
+            links = through.objects.filter(**{f'{column}__in': duplicates})
+            linked = set(through.objects.filter(
+                **{column: group['keep']}
+            ).values_list('recipe_id', flat=True))
+            recipe_ids = set(links.values_list('recipe_id', flat=True))
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: group['keep']})
+                for recipe_id in recipe_ids - linked
+            ])
+            links.delete()
+            duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names,
+            migrations.RunPython.noop
+        ),
+    ]
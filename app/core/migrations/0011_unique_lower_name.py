@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_merge_duplicate_names'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+                'ON core_tag (user_id, lower(name))',
+            reverse_sql='DROP INDEX core_tag_user_lower_name_uniq',
+        ),
+        migrations.RunSQL(
+            sql='CREATE UNIQUE INDEX core_ingr_user_lower_name_uniq '
+                'ON core_ingredient (user_id, lower(name))',
+            reverse_sql='DROP INDEX core_ingr_user_lower_name_uniq',
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:01
+
+from collections import Counter
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+IMAGE_FILE_FIELDS = ('image', 'image_thumbnail', 'image_medium', 'image_webp')
+
+
+def count_references(apps, schema_editor):
+    """Count the references of the images stored before the blob table"""
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    counts = Counter(
+        name
+        for names in Recipe.objects.values_list(*IMAGE_FILE_FIELDS).iterator()
+        for name in names if name
+    )
+    ImageBlob.objects.bulk_create(
+        (ImageBlob(name=name, references=count)
+         for name, count in counts.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_name),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(editable=False, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='tags',
+            field=models.ManyToManyField(to='core.Tag'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 10000
+
+# snapshot of core.models.SEARCH_VECTOR_SQL over a range of ids
+FILL_SQL = '''
+    UPDATE core_recipe AS recipe SET search_vector =
+        setweight(to_tsvector(%s::regconfig, recipe.title), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(tag.name, ' ')
+            FROM core_recipe_tags AS link
+            JOIN core_tag AS tag ON tag.id = link.tag_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM core_recipe_ingredients AS link
+            JOIN core_ingredient AS ingredient
+                ON ingredient.id = link.ingredient_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'C')
+    WHERE recipe.id >= %s AND recipe.id < %s
+'''
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Compute the search vectors of the existing recipes by id ranges"""
+    config = settings.RECIPE_SEARCH_CONFIG
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_recipe')
+        first, last = cursor.fetchone()
+        if first is None:
+            return
+        for start in range(first, last + 1, BATCH_SIZE):
+            cursor.execute(
+                FILL_SQL,
+                [config, config, config, start, start + BATCH_SIZE]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,51 @@
 import uuid
 import os
+from collections import Counter, defaultdict
 
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, router
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save
 from django.conf import settings
+from django.utils import timezone
 
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 
+from core.storage import ContentAddressedStorage
+
+RECIPE_IMAGE_DIR = 'uploads/recipe'
+UPLOAD_PARTIAL_DIR = os.path.join(RECIPE_IMAGE_DIR, 'partial')
+recipe_image_storage = ContentAddressedStorage()
+
+# the title weighs more than tag names, which weigh more than ingredients
+SEARCH_VECTOR_SQL = '''
+    UPDATE core_recipe AS recipe SET search_vector =
+        setweight(to_tsvector(%s::regconfig, recipe.title), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(tag.name, ' ')
+            FROM core_recipe_tags AS link
+            JOIN core_tag AS tag ON tag.id = link.tag_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM core_recipe_ingredients AS link
+            JOIN core_ingredient AS ingredient
+                ON ingredient.id = link.ingredient_id
+            WHERE link.recipe_id = recipe.id
+        ), '')), 'C')
+    WHERE recipe.id IN ({ids})
+'''
+
 
 def recipe_image_file_name(instance, filename):
     """Generate image file path for new recipe image"""
     ext = filename.split('.')[-1]
     file_path = f'{uuid.uuid4()}.{ext}'
-    return os.path.join('uploads/recipe', file_path)
+    return os.path.join(RECIPE_IMAGE_DIR, file_path)
 
 
 class UserManager(BaseUserManager):
@@ -47,6 +80,66 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeAttrManager(models.Manager):
+
+    def match_names(self, user, names, using=None):
+        """Return {name: (lower name, id or None)} of the user's objects
+
+        Names are lowered by the database, both sides, like the unique
+        (user_id, lower(name)) index: Python's str.lower() can disagree
+        with it for some characters, depending on the database locale.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        table = self.model._meta.db_table
+        using = using or router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT given.name, lower(given.name), {table}.id '
+                f'FROM unnest(%s::text[]) AS given (name) '
+                f'LEFT JOIN {table} ON {table}.user_id = %s '
+                f'AND lower({table}.name) = lower(given.name)',
+                [names, user.pk]
+            )
+            return {
+                name: (lower_name, pk)
+                for name, lower_name, pk in cursor.fetchall()
+            }
+
+    def get_or_create_by_name(self, user, name):
+        """Return the user's object named `name` ignoring case
+
+        Runs a single INSERT ... ON CONFLICT on the unique
+        (user_id, lower(name)) index, so concurrent calls never create
+        duplicates. Returns an (object, created) tuple like get_or_create.
+        """
+        table = self.model._meta.db_table
+        using = router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, name) VALUES (%s, %s) '
+                f'ON CONFLICT (user_id, lower(name)) '
+                f'DO UPDATE SET name = {table}.name '
+                f'RETURNING id, name, xmax = 0',
+                [user.pk, name]
+            )
+            pk, name, created = cursor.fetchone()
+        obj = self.model(pk=pk, user=user, name=name)
+        obj._state.adding = False
+        obj._state.db = using
+        if created:
+            post_save.send(
+                sender=self.model,
+                instance=obj,
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=using
+            )
+        return obj, created
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
@@ -54,6 +147,17 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
+        # (user_id, lower(name)) is also unique, see migration 0011
+
     def __str__(self):
         return self.name
 
@@ -66,12 +170,112 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='core_ingr_user_name_idx'
+            ),
+        ]
+        # (user_id, lower(name)) is also unique, see migration 0011
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def touch(self, **fields):
+        """Bump the version and modified time of the recipes
+
+        Any `fields` are updated in the same statement.
+        """
+        return self.update(
+            version=models.F('version') + 1,
+            modified=timezone.now(),
+            **fields
+        )
+
+    def update_search(self):
+        """Recompute the search vectors of the recipes
+
+        Runs a single UPDATE over the recipes of the queryset, reading
+        their tag and ingredient names with correlated subqueries.
+        Returns the number of recipes updated.
+        """
+        using = router.db_for_write(self.model)
+        try:
+            ids, params = self.values('pk').query.get_compiler(
+                using
+            ).as_sql()
+        except EmptyResultSet:
+            return 0
+        config = settings.RECIPE_SEARCH_CONFIG
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                SEARCH_VECTOR_SQL.format(ids=ids),
+                [config, config, config, *params]
+            )
+            return cursor.rowcount
+
+
+class ImageBlobQuerySet(models.QuerySet):
+
+    def update_references(self, added=(), removed=()):
+        """Count references to the `added` names, uncount the `removed` ones
+
+        Names are counted once per occurrence and empty names are ignored.
+        Issues one UPDATE per distinct delta, usually a single one.
+        """
+        counts = Counter(name for name in added if name)
+        counts.subtract(name for name in removed if name)
+        by_delta = defaultdict(list)
+        for name, delta in counts.items():
+            if delta:
+                by_delta[delta].append(name)
+        new = [
+            self.model(name=name)
+            for delta, names in by_delta.items() if delta > 0
+            for name in names
+        ]
+        if new:
+            self.bulk_create(new, ignore_conflicts=True)
+        for delta, names in by_delta.items():
+            self.filter(name__in=names).update(
+                references=Greatest(models.F('references') + delta, 0)
+            )
+
+
+class ImageBlob(models.Model):
+    """Number of references to a shared recipe image file"""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+    objects = ImageBlobQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
 class Recipe(models.Model):
     """Recipe object"""
+    IMAGE_FILE_FIELDS = (
+        'image',
+        'image_thumbnail',
+        'image_medium',
+        'image_webp',
+    )
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -82,7 +286,112 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_name)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_name,
+        storage=recipe_image_storage
+    )
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True,
+        editable=False
+    )
+    # when the variants were queued, see the requeue_images command
+    image_queued = models.DateTimeField(null=True, editable=False)
+    image_thumbnail = models.ImageField(
+        null=True,
+        editable=False,
+        storage=recipe_image_storage
+    )
+    image_medium = models.ImageField(
+        null=True,
+        editable=False,
+        storage=recipe_image_storage
+    )
+    image_webp = models.ImageField(
+        null=True,
+        editable=False,
+        storage=recipe_image_storage
+    )
+    version = models.PositiveIntegerField(default=1, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+    # title, tag and ingredient names, see RecipeQuerySet.update_search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            # the id makes them cover the tie breaker of the orderings
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
+        # the title also has a trigram index when pg_trgm is available,
+        # see migration 0017
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded image names to count references on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_images = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.IMAGE_FILE_FIELDS
+        }
+        return instance
+
+    def image_names(self):
+        """Return the field -> name map of the loaded image fields"""
+        deferred = self.get_deferred_fields()
+        return {
+            name: getattr(self, name).name
+            for name in self.IMAGE_FILE_FIELDS if name not in deferred
+        }
+
+    def save(self, *args, **kwargs):
+        """Bump the version each time an existing recipe is saved"""
+        bump = not self._state.adding
+        if bump:
+            self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
+
+class UploadSession(models.Model):
+    """Resumable upload of a recipe image, written in ranges"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def partial_name(self):
+        """Storage name of the file the ranges are written to"""
+        return os.path.join(UPLOAD_PARTIAL_DIR, str(self.id))
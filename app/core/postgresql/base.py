@@ -0,0 +1,26 @@
+from django.db.backends.postgresql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend checking reused connections on their first use
+
+    Django only notices a broken persistent connection when a query
+    fails, which would fail the first request after a database restart
+    or a pooler timeout. With CONN_HEALTH_CHECKS, a connection reused by
+    a request is pinged before its first query of the request, so that
+    the aliases a request never uses cost nothing.
+    """
+    health_check_done = False
+
+    def connect(self):
+        # before connecting, as connect() ensures the connection itself
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_done:
+            self.health_check_done = True
+            if self.settings_dict.get('CONN_HEALTH_CHECKS') and \
+                    not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,89 @@
+import math
+from decimal import Decimal
+from functools import partial
+
+from rest_framework.renderers import JSONRenderer
+
+from core.metrics import serializing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# containers _has_non_finite looks into without encoding them first
+PRUNE_SIZE = 32
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with orjson when it is installed
+
+    Gives the same bytes as JSONRenderer for compact, non ASCII escaped
+    output: types orjson does not handle natively, datetimes included, go
+    through the DRF encoder, and line and paragraph separators are escaped
+    the same way. Anything else, or anything orjson refuses (such as
+    integers over 64 bits), is rendered by JSONRenderer. So are NaN and
+    infinities, which JSONRenderer refuses under STRICT_JSON or writes as
+    NaN and Infinity: orjson writes null for the floats, so output with
+    a null is checked for them, and non-finite Decimals are refused.
+    """
+    options = orjson and (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serializing():
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None or self.ensure_ascii or \
+                not self.compact or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        dumps = partial(
+            orjson.dumps,
+            default=partial(_default, self.encoder_class().default),
+            option=self.options
+        )
+        try:
+            ret = dumps(data)
+        except orjson.JSONEncodeError:
+            ret = None
+        if ret is None or b'null' in ret and _has_non_finite(data, dumps):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+def _default(default, obj):
+    if isinstance(obj, Decimal) and not obj.is_finite():
+        raise TypeError('non-finite Decimal')
+    return default(obj)
+
+
+def _has_non_finite(data, dumps):
+    """Return whether the data holds a NaN or infinite float
+
+    Containers of more than PRUNE_SIZE values are only looked into when
+    `dumps` writes a null for them, which skips the results of a page
+    whose only nulls are its links.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, (dict, list, tuple)):
+            if value is data or len(value) <= PRUNE_SIZE or \
+                    b'null' in dumps(value):
+                stack.extend(
+                    value.values() if isinstance(value, dict) else value
+                )
+    return False
@@ -0,0 +1,85 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def use_replica():
+    """Send the reads of the current thread to a random replica"""
+    _state.alias = random.choice(settings.REPLICA_DATABASES)
+
+
+def use_primary():
+    """Send the reads of the current thread back to the primary"""
+    _state.alias = None
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the thread, writes to default
+
+    Writes are routed explicitly so that saving an instance read from a
+    replica does not follow its `_state.db` there.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'alias', None)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get the schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+def _sticky_key(user):
+    return f'replica:sticky:{user.pk}'
+
+
+class ReplicaReadMixin:
+    """Serve the safe requests of a viewset from a replica
+
+    Authentication runs first, on the primary. After a successful write a
+    user reads from the primary for REPLICA_STICKY_SECONDS, longer than
+    the replication lag, so they see their own writes. The marker lives
+    in the REPLICA_STICKY_CACHE alias, which has to be shared by the
+    processes. Actions in `primary_actions` always read from the primary.
+    """
+    primary_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if settings.REPLICA_DATABASES and \
+                request.method in SAFE_METHODS and \
+                self.action not in self.primary_actions and \
+                not caches[settings.REPLICA_STICKY_CACHE].get(
+                    _sticky_key(request.user)
+                ):
+            use_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if settings.REPLICA_DATABASES and \
+                request.method not in SAFE_METHODS and \
+                response.status_code < 400 and \
+                request.user.is_authenticated:
+            caches[settings.REPLICA_STICKY_CACHE].set(
+                _sticky_key(request.user),
+                True,
+                settings.REPLICA_STICKY_SECONDS
+            )
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            use_primary()
@@ -0,0 +1,147 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_delete, \
+                                     m2m_changed
+from django.dispatch import receiver
+
+from core.models import ImageBlob, Tag, Ingredient, Recipe, \
+                        UploadSession, recipe_image_storage
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_link_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Bump the version of recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).touch()
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).touch()
+    elif action == 'pre_clear':
+        _recipes_linked_to(instance).touch()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_rename(sender, instance, created, **kwargs):
+    """Bump the version of recipes that nest a changed tag or ingredient"""
+    if not created:
+        _recipes_linked_to(instance).touch()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_on_delete(sender, instance, **kwargs):
+    """Bump the version of recipes losing a tag or ingredient"""
+    _recipes_linked_to(instance).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_on_save(sender, instance, update_fields, **kwargs):
+    """Recompute the search vector of a recipe whose title may have changed"""
+    if update_fields is None or 'title' in update_fields:
+        Recipe.objects.filter(pk=instance.pk).update_search()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_search_on_link_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Recompute the search vectors of recipes whose links changed
+
+    The recipes losing a tag or ingredient cleared from its side are only
+    known before the clear, and their vectors change after it.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).update_search()
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).update_search()
+    elif action == 'pre_clear':
+        instance._search_recipe_ids = _linked_recipe_ids(instance)
+    elif action == 'post_clear':
+        Recipe.objects.filter(
+            pk__in=instance.__dict__.pop('_search_recipe_ids', ())
+        ).update_search()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_search_on_rename(sender, instance, created, **kwargs):
+    """Recompute the search vectors of recipes linked to a changed name"""
+    if not created:
+        _recipes_linked_to(instance).update_search()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_search_on_delete(sender, instance, **kwargs):
+    """Remember the recipes losing a tag or ingredient being deleted"""
+    instance._search_recipe_ids = _linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_on_delete(sender, instance, **kwargs):
+    """Recompute the search vectors of recipes that lost a name"""
+    Recipe.objects.filter(
+        pk__in=instance.__dict__.pop('_search_recipe_ids', ())
+    ).update_search()
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_references(sender, instance, created, **kwargs):
+    """Count references to the image files a saved recipe changed
+
+    Fields whose previous name is unknown are only counted, never
+    uncounted, so that a shared file is never collected while in use.
+    """
+    current = instance.image_names()
+    previous = {} if created else getattr(instance, '_loaded_images', {})
+    changed = [
+        field for field, name in current.items()
+        if previous.get(field) != name
+    ]
+    if changed:
+        ImageBlob.objects.update_references(
+            added=[current[field] for field in changed],
+            removed=[previous[field] for field in changed
+                     if field in previous]
+        )
+    instance._loaded_images = current
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_image_references(sender, instance, **kwargs):
+    """Uncount the image files of a deleted recipe"""
+    names = getattr(instance, '_loaded_images', None)
+    if names is None:
+        names = instance.image_names()
+    ImageBlob.objects.update_references(removed=names.values())
+
+
+@receiver(post_delete, sender=UploadSession)
+def delete_partial_upload(sender, instance, **kwargs):
+    """Delete the file of a finished, aborted or expired upload"""
+    recipe_image_storage.delete(instance.partial_name)
+
+
+def _recipes_linked_to(instance):
+    if isinstance(instance, Tag):
+        return Recipe.objects.filter(tags=instance)
+    return Recipe.objects.filter(ingredients=instance)
+
+
+def _linked_recipe_ids(instance):
+    return list(_recipes_linked_to(instance).values_list('pk', flat=True))
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Have the reused connections checked on their next use
+
+    See core.postgresql.base.DatabaseWrapper, which does the check.
+    """
+    for connection in connections.all():
+        connection.health_check_done = False
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+from functools import partial
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the SHA-256 of their content
+
+    The content is hashed while it is streamed to a temporary file next
+    to its destination, which is then renamed to `<sha256><ext>` in the
+    directory of the requested name. Identical files are therefore
+    stored once and shared: saving content that already exists only
+    refreshes the modification time of the existing file, which keeps it
+    out of the grace period of the gc_images command.
+    """
+    temporary_prefix = '.upload-'
+
+    def get_available_name(self, name, max_length=None):
+        """Return the name as is, _save derives it from the content"""
+        return name
+
+    def _save(self, name, content):
+        full_directory = self.path(os.path.dirname(name))
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(
+            dir=full_directory,
+            prefix=self.temporary_prefix
+        )
+        try:
+            with os.fdopen(fd, 'wb') as destination:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    destination.write(chunk)
+            return self._store(temporary, name, digest)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def save_file(self, path, name):
+        """Move the complete file at `path` in the storage, by its content
+
+        `path` must be on the storage's file system, so that the file is
+        renamed rather than copied. Returns the name of the stored file.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(partial(source.read, 64 * 1024), b''):
+                digest.update(chunk)
+        return self._store(path, name, digest)
+
+    def _store(self, path, name, digest):
+        """Rename the file at `path` after its digest, or drop a duplicate"""
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        name = os.path.join(directory, digest.hexdigest() + extension)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.utime(full_path)
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(path, self.file_permissions_mode or 0o644)
+            os.replace(path, full_path)
+        return name
@@ -1,24 +1,132 @@
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core.models import ImageBlob, Recipe, UploadSession, \
+                        recipe_image_storage
+
+ENSURE_CONNECTION = \
+    'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
 
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """test wait for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch(ENSURE_CONNECTION) as ec:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """test wait for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+        self.assertEqual(
+            [call[0][0] for call in ts.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1.6]
+        )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """test wait for db gives up after its timeout"""
+        with patch(ENSURE_CONNECTION, side_effect=OperationalError), \
+                patch('time.monotonic', side_effect=[0, 1, 2, 3]):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=3, stdout=StringIO())
+        self.assertEqual(ts.call_count, 2)
+
+    def test_import_recipes(self):
+        """test importing recipes from a csv file"""
+        user = get_user_model().objects.create_user('cmd@test.com', 'pw')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as csv_file:
+            csv_file.write(
+                'title,time_minutes,price,tags\n'
+                'Soup,20,3.00,Lunch|Vegan\n'
+                'Salad,5,2.00,Lunch\n'
+            )
+            csv_file.flush()
+            out = StringIO()
+            call_command(
+                'import_recipes',
+                csv_file.name,
+                email=user.email,
+                batch_size=1,
+                stdout=out
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 2)
+        self.assertEqual(user.tag_set.count(), 2)
+        self.assertIn('imported 2 recipes', out.getvalue())
+
+    def test_gc_images(self):
+        """test gc_images deletes old files without references only"""
+        user = get_user_model().objects.create_user('gc@test.com', 'pw')
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Soup',
+            time_minutes=20,
+            price=3
+        )
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media):
+            recipe.image.save('a.jpg', ContentFile(b'replaced'))
+            replaced = recipe.image.name
+            recipe.image.save('b.jpg', ContentFile(b'current'))
+            recent = recipe_image_storage.save(
+                'uploads/recipe/c.jpg',
+                ContentFile(b'recent')
+            )
+            for name in (replaced, recipe.image.name):
+                os.utime(recipe_image_storage.path(name), (0, 0))
+
+            out = StringIO()
+            call_command('gc_images', stdout=out)
+
+            remaining = recipe_image_storage.listdir('uploads/recipe')[1]
+        self.assertIn('deleted 1 files', out.getvalue())
+        self.assertEqual(
+            sorted(f'uploads/recipe/{name}' for name in remaining),
+            sorted([recipe.image.name, recent])
+        )
+        self.assertFalse(ImageBlob.objects.filter(name=replaced).exists())
+
+    def test_gc_images_expired_uploads(self):
+        """test gc_images deletes upload sessions past their ttl"""
+        user = get_user_model().objects.create_user('gc@test.com', 'pw')
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Soup',
+            time_minutes=20,
+            price=3
+        )
+        session = UploadSession.objects.create(
+            user=user,
+            recipe=recipe,
+            filename='soup.jpg',
+            size=10
+        )
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media):
+            path = recipe_image_storage.path(session.partial_name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as partial:
+                partial.write(b'x')
+            with override_settings(IMAGE_UPLOAD_SESSION_TTL=3600):
+                call_command('gc_images', stdout=StringIO())
+            self.assertTrue(UploadSession.objects.exists())
+
+            with override_settings(IMAGE_UPLOAD_SESSION_TTL=-1):
+                call_command('gc_images', stdout=StringIO())
+            self.assertFalse(UploadSession.objects.exists())
+            self.assertFalse(os.path.exists(path))
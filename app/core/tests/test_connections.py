@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from core.postgresql.base import DatabaseWrapper
+from core.signals import check_persistent_connections
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+    """Test the health check of persistent connections"""
+
+    def reused_connection(self, usable=True, health_checks=True):
+        """Return a wrapper around an open connection of a past request"""
+        wrapper = DatabaseWrapper(dict(
+            connection.settings_dict,
+            CONN_HEALTH_CHECKS=health_checks
+        ))
+        wrapper.connection = object()
+        patcher = patch.object(wrapper, 'is_usable', return_value=usable)
+        self.is_usable = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(wrapper, 'close')
+        self.close = patcher.start()
+        self.addCleanup(patcher.stop)
+        with patch('core.signals.connections') as connections:
+            connections.all.return_value = [wrapper]
+            check_persistent_connections()
+        return wrapper
+
+    def test_checked_on_first_use_only(self):
+        """Test a request pings a reused connection once, when used"""
+        wrapper = self.reused_connection()
+        self.is_usable.assert_not_called()
+
+        wrapper.ensure_connection()
+        wrapper.ensure_connection()
+
+        self.is_usable.assert_called_once_with()
+        self.close.assert_not_called()
+
+    def test_broken_connection_closed(self):
+        """Test a connection the server dropped is closed before use"""
+        wrapper = self.reused_connection(usable=False)
+
+        wrapper.ensure_connection()
+
+        self.close.assert_called_once_with()
+
+    def test_checks_disabled(self):
+        """Test connections are not pinged without CONN_HEALTH_CHECKS"""
+        wrapper = self.reused_connection(usable=False, health_checks=False)
+
+        wrapper.ensure_connection()
+
+        self.is_usable.assert_not_called()
+        self.close.assert_not_called()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import recipe_image_storage
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    return reverse('media', args=[name])
+
+
+class MediaServingTests(TestCase):
+    """Test serving the files of MEDIA_ROOT"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.name = recipe_image_storage.save(
+            'uploads/recipe/photo.jpg',
+            ContentFile(CONTENT)
+        )
+
+    def test_serve_hashed_file_immutable(self):
+        """Test content addressed files are cached as immutable"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertIn('immutable', res['Cache-Control'])
+
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        self.assertEqual(res.status_code, 304)
+
+    def test_serve_range(self):
+        """Test single byte ranges are served as partial content"""
+        for header, start, end in (('bytes=10-19', 10, 19),
+                                   ('bytes=1000-', 1000, 1023),
+                                   ('bytes=-4', 1020, 1023)):
+            res = self.client.get(media_url(self.name), HTTP_RANGE=header)
+
+            self.assertEqual(res.status_code, 206)
+            self.assertEqual(
+                b''.join(res.streaming_content),
+                CONTENT[start:end + 1]
+            )
+            self.assertEqual(res['Content-Range'], f'bytes {start}-{end}/1024')
+            self.assertEqual(res['Content-Length'], str(end - start + 1))
+
+    def test_serve_unsatisfiable_range(self):
+        """Test a range past the end of the file is refused"""
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=2000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */1024')
+
+    def test_stale_if_range_serves_whole_file(self):
+        """Test a range is ignored when If-Range does not match"""
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    @override_settings(MEDIA_SERVE_MODE='accel')
+    def test_accel_redirect(self):
+        """Test the proxy is asked to send the file in accel mode"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{self.name}'
+        )
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='sendfile')
+    def test_sendfile(self):
+        """Test the server is asked to send the file in sendfile mode"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.abspath(recipe_image_storage.path(self.name))
+        )
+
+    def test_hidden_and_partial_files_not_served(self):
+        """Test unfinished uploads and files outside the root are hidden"""
+        partial = recipe_image_storage.path('uploads/recipe/partial/abc')
+        os.makedirs(os.path.dirname(partial))
+        with open(partial, 'wb') as partial_file:
+            partial_file.write(CONTENT)
+
+        for name in ('uploads/recipe/partial/abc',
+                     'uploads/recipe/.upload-abc',
+                     '../settings.py',
+                     'uploads/recipe/missing.jpg'):
+            res = self.client.get(media_url(name))
+            self.assertEqual(res.status_code, 404)
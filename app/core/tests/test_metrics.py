@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+@override_settings(METRICS_TOKEN='')
+class MetricsTests(TestCase):
+    """Test the request metrics and their endpoint"""
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+        self.user = get_user_model().objects.create_user(
+            'metrics@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=10,
+            price='5.00'
+        )
+
+    def test_histogram_exposition(self):
+        """Test histograms are exposed as cumulative buckets"""
+        histogram = metrics.Histogram('test_seconds', 'Test.', (0.1, 1))
+        histogram.observe(('View', 'list'), 0.05)
+        histogram.observe(('View', 'list'), 0.5)
+        histogram.observe(('View', 'list'), 5)
+
+        self.assertEqual(histogram.expose(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="View",action="list",le="0.1"} 1',
+            'test_seconds_bucket{view="View",action="list",le="1"} 2',
+            'test_seconds_bucket{view="View",action="list",le="+Inf"} 3',
+            'test_seconds_sum{view="View",action="list"} 5.55',
+            'test_seconds_count{view="View",action="list"} 3',
+        ])
+
+    def test_request_recorded_by_view_and_action(self):
+        """Test a request records its queries and times under its action"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        labels = ('RecipeViewSet', 'list')
+        self.assertEqual(
+            metrics.REQUEST_QUERIES.series[labels][1],
+            len(queries)
+        )
+        for histogram in metrics.HISTOGRAMS:
+            self.assertEqual(histogram.series[labels][2], 1)
+        serializer_time = metrics.REQUEST_SERIALIZER_TIME.series[labels][1]
+        self.assertGreater(serializer_time, 0)
+        self.assertLess(
+            serializer_time,
+            metrics.REQUEST_LATENCY.series[labels][1]
+        )
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            'http_request_db_queries_count'
+            '{view="RecipeViewSet",action="list"} 1',
+            res.content.decode()
+        )
+
+    @override_settings(SLOW_QUERY_MS=1e-6, SLOW_REQUEST_QUERIES=1)
+    def test_slow_queries_and_requests_logged(self):
+        """Test queries and requests over the thresholds are logged"""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertTrue(any(
+            'Slow query on default' in line and 'core_recipe' in line
+            for line in logs.output
+        ))
+        self.assertIn('Slow request GET ' + RECIPES_URL, logs.output[-1])
+        self.assertIn('(RecipeViewSet.list)', logs.output[-1])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Test the endpoint requires the token when one is set"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_metrics_closed_without_token(self):
+        """Test only staff users see the endpoint when no token is set"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_login(self.user)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -51,6 +52,30 @@ class ModelTest(TestCase):
         )
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_ignoring_case(self):
+        """test a user can not have two tags differing only by case"""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='vegan')
+
+    def test_get_or_create_by_name(self):
+        """test get_or_create_by_name returns the existing ingredient"""
+        user = sample_user()
+        salt, created = models.Ingredient.objects.get_or_create_by_name(
+            user,
+            'Salt'
+        )
+        self.assertTrue(created)
+
+        same, created = models.Ingredient.objects.get_or_create_by_name(
+            user,
+            'SALT'
+        )
+        self.assertFalse(created)
+        self.assertEqual(same.pk, salt.pk)
+        self.assertEqual(same.name, 'Salt')
+
     def test_ingredient_str(self):
         """test ingredient str representation"""
         ingredient = models.Ingredient.objects.create(
@@ -69,6 +94,29 @@ class ModelTest(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
+    def test_recipe_version_bumped(self):
+        """Test saving a recipe or changing its tags bumps its version"""
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Steak and mushroom souce',
+            time_minutes=5,
+            price=5.00,
+        )
+        self.assertEqual(recipe.version, 1)
+
+        recipe.title = 'Steak and mushroom sauce'
+        recipe.save()
+        self.assertEqual(recipe.version, 2)
+
+        tag = models.Tag.objects.create(user=user, name='Dinner')
+        recipe.tags.add(tag)
+        tag.name = 'Supper'
+        tag.save()
+        tag.recipe_set.clear()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 5)
+
     @patch('uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that image is saved in the correct location"""
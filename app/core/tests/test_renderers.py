@@ -0,0 +1,71 @@
+import datetime
+import decimal
+import unittest
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer, orjson
+
+DATA = {
+    'id': 1,
+    1: [True, None, 1.5],
+    'price': decimal.Decimal('4.50'),
+    'title': 'Crème brûlée\u2028',
+    'uuid': uuid.UUID('12345678123456781234567812345678'),
+    'when': datetime.datetime(
+        2020, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+    ),
+    'day': datetime.date(2020, 1, 2),
+}
+ROWS = [{'id': i, 'score': i / 2, 'tags': (None, 'x')} for i in range(40)]
+NON_FINITE = [
+    {'next': None, 'results': ROWS[:20] + [{'score': float('nan')}]},
+    {'results': ROWS + [{'id': 40, 'weights': [float('-inf')]}]},
+    {'total': decimal.Decimal('Infinity')},
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer gives the same bytes as JSONRenderer"""
+
+    def assertSameBytes(self, data, media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    @unittest.skipIf(orjson is None, 'needs orjson')
+    def test_orjson_same_bytes(self):
+        """Test orjson output matches, with types it does not handle"""
+        self.assertSameBytes(DATA)
+        self.assertSameBytes({'big': 2 ** 70})
+
+    def test_fallback_same_bytes(self):
+        """Test indented and empty output falls back to JSONRenderer"""
+        self.assertSameBytes(DATA, 'application/json; indent=2')
+        self.assertSameBytes(None)
+
+    def test_non_finite_numbers(self):
+        """Test NaN and infinities are handled as JSONRenderer does"""
+        lenient = {'strict': False}
+        for data in NON_FINITE:
+            for renderer in (FastJSONRenderer(), JSONRenderer()):
+                with self.assertRaises(ValueError):
+                    renderer.render(data)
+            self.assertEqual(
+                type('Fast', (FastJSONRenderer,), lenient)().render(data),
+                type('Plain', (JSONRenderer,), lenient)().render(data)
+            )
+
+    @unittest.skipIf(orjson is None, 'needs orjson')
+    def test_nulls_rendered_by_orjson(self):
+        """Test nulls without non-finite numbers keep the orjson output"""
+        data = {'next': None, 'results': ROWS}
+        with patch.object(JSONRenderer, 'render') as render:
+            FastJSONRenderer().render(data)
+        render.assert_not_called()
+        self.assertSameBytes(data)
@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.checks import check_replica_sticky_cache
+from core.models import Recipe
+from core.replicas import ReplicaRouter, use_primary, use_replica
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """Test reads of the recipe API are routed to the replicas"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'replica@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        # record where reads are routed but run them on the test database
+        self.reads = []
+        original = ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            self.reads.append(original(router, model, **hints))
+
+        routing = patch.object(ReplicaRouter, 'db_for_read', db_for_read)
+        routing.start()
+        self.addCleanup(routing.stop)
+
+    def test_router(self):
+        """Test reads follow the thread's choice, writes go to default"""
+        router = ReplicaRouter()
+        use_replica()
+        self.addCleanup(use_primary)
+
+        router.db_for_read(Recipe)
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+        use_primary()
+        router.db_for_read(Recipe)
+
+        self.assertEqual(self.reads, ['replica', None])
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+    def test_safe_requests_read_replica(self):
+        """Test listing recipes reads from a replica, then the primary"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('replica', self.reads)
+
+        self.reads.clear()
+        Recipe.objects.count()
+        self.assertEqual(self.reads, [None])
+
+    def test_export_streams_from_replica(self):
+        """Test an export keeps reading the replica chosen for the request"""
+        Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=10,
+            price=5.00
+        )
+        res = self.client.get(EXPORT_URL)
+        self.assertIn('replica', self.reads)
+
+        self.reads.clear()
+        content = b''.join(res.streaming_content)
+
+        self.assertIn(b'Soup', content)
+        self.assertEqual(self.reads, [])
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a user reads from the primary right after a write"""
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('replica', self.reads)
+
+        self.client.get(TAGS_URL)
+
+        self.assertNotIn('replica', self.reads)
+
+    def test_failed_write_not_sticky(self):
+        """Test a rejected write does not move reads to the primary"""
+        self.client.post(TAGS_URL, {'name': ''})
+
+        self.client.get(TAGS_URL)
+
+        self.assertIn('replica', self.reads)
+
+
+class ReplicaStickyCacheCheckTests(TestCase):
+    """Test the check of the cache marking recent writes"""
+
+    @override_settings(REPLICA_DATABASES=['replica'], CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+    }})
+    def test_local_memory_cache(self):
+        """Test a per process sticky cache is reported with replicas"""
+        errors = check_replica_sticky_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.W001'])
+
+    @override_settings(REPLICA_DATABASES=[], CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+    }})
+    def test_no_replicas(self):
+        """Test the cache does not matter without replicas"""
+        self.assertEqual(check_replica_sticky_cache(None), [])
+
+    @override_settings(REPLICA_DATABASES=['replica'], CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    }})
+    def test_shared_cache(self):
+        """Test a cache shared by the processes passes"""
+        self.assertEqual(check_replica_sticky_cache(None), [])
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.models import ImageBlob, Recipe, recipe_image_storage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test the content addressed storage of recipe images"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            'storage@test.com',
+            'pass123'
+        )
+
+    def sample_recipe(self):
+        return Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=30,
+            price=5
+        )
+
+    def test_identical_content_shared(self):
+        """test saving the same content twice stores a single file"""
+        first = recipe_image_storage.save('uploads/a.JPG', ContentFile(b'x'))
+        second = recipe_image_storage.save('uploads/b.jpg', ContentFile(b'x'))
+        other = recipe_image_storage.save('uploads/c.jpg', ContentFile(b'y'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.endswith('.jpg'))
+        files = os.listdir(recipe_image_storage.path('uploads'))
+        self.assertEqual(len(files), 2)
+
+    def test_references_counted(self):
+        """test recipes count references to their image files"""
+        recipe1 = self.sample_recipe()
+        recipe2 = self.sample_recipe()
+        recipe1.image.save('a.jpg', ContentFile(b'x'))
+        recipe2.image.save('b.jpg', ContentFile(b'x'))
+        name = recipe1.image.name
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 2)
+
+        recipe1.image.save('c.jpg', ContentFile(b'y'))
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 1)
+
+        recipe2 = Recipe.objects.get(pk=recipe2.pk)
+        recipe2.title = 'Stew'
+        recipe2.save()
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 1)
+
+        recipe2.delete()
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 0)
+        self.assertEqual(
+            ImageBlob.objects.get(name=recipe1.image.name).references,
+            1
+        )
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import CacheBucketStore, local_buckets, parse_rate
+
+TAGS_URL = reverse('recipe:tag-list')
+TOKEN_URL = reverse('user:token')
+
+RATES = {
+    'read': '3/min',
+    'write': '2/min',
+    'upload': '1/min',
+    'login': '2/min',
+}
+
+
+@override_settings(THROTTLE_RATES=RATES)
+class ThrottlingTests(TestCase):
+    """Test the token bucket throttling of the API"""
+
+    def setUp(self):
+        local_buckets.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'throttle@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_parse_rate(self):
+        """Test a rate gives the bucket capacity and refill per second"""
+        self.assertEqual(parse_rate('120/min'), (120, 2))
+        self.assertEqual(parse_rate('10/s'), (10, 10))
+
+    def test_write_budget(self):
+        """Test writes beyond the bucket are throttled with headers"""
+        for name in ('Vegan', 'Dessert'):
+            res = self.client.post(TAGS_URL, {'name': name})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['X-RateLimit-Limit'], '2')
+        self.assertEqual(res['X-RateLimit-Remaining'], '0')
+        self.assertEqual(res['X-RateLimit-Reset'], '60')
+
+        res = self.client.post(TAGS_URL, {'name': 'Breakfast'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+    def test_separate_budgets(self):
+        """Test reads, writes and users have their own buckets"""
+        for _ in range(2):
+            self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(
+            self.client.post(TAGS_URL, {'name': 'Vegan'}).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-RateLimit-Remaining'], '2')
+
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@test.com',
+            'pass123'
+        ))
+        res = other.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_login_budget_per_ip(self):
+        """Test anonymous logins are throttled per client address"""
+        client = APIClient()
+        payload = {'email': 'throttle@test.com', 'password': 'pass123'}
+        for _ in range(2):
+            res = client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_CACHE='default')
+    def test_cache_store(self):
+        """Test the buckets can live in a shared cache"""
+        self.client.get(TAGS_URL)
+        local_buckets.clear()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-RateLimit-Remaining'], '1')
+
+    def test_cache_store_concurrent(self):
+        """Test concurrent requests never spend the same token"""
+        class SlowCache:
+            """Default cache whose reads leave room for other threads"""
+
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def get(self, key):
+                value = cache.get(key)
+                time.sleep(0.001)
+                return value
+
+        store = CacheBucketStore(SlowCache())
+        allowed = []
+
+        def spend():
+            for _ in range(20):
+                allowed.append(store.take('read:user:1', 50, 1 / 3600)[0])
+
+        threads = [threading.Thread(target=spend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(allowed.count(True), 50)
@@ -0,0 +1,173 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """Return the (capacity, tokens per second) of a '<count>/<period>' rate
+
+    The bucket holds `count` requests and refills completely over the
+    period, so a client can burst `count` requests then keeps going at
+    the average rate.
+    """
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period]
+
+
+def _take(state, capacity, refill, now):
+    """Spend a token of a bucket, return (new state, allowed, tokens left)"""
+    tokens, stamp = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * refill)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return (tokens, now), allowed, tokens
+
+
+class LocalBucketStore:
+    """Token buckets kept in the process, updated under a lock
+
+    Exact for single node deploys running one process. The least recently
+    used buckets are dropped past THROTTLE_LOCAL_MAX_KEYS, which refills
+    them.
+    """
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill):
+        with self._lock:
+            state, allowed, tokens = _take(
+                self._buckets.get(key),
+                capacity,
+                refill,
+                time.time()
+            )
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > settings.THROTTLE_LOCAL_MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets kept in a Django cache shared by the processes
+
+    A bucket is read and written under a lock taken with cache.add(),
+    atomic in memcached and redis, so concurrent requests of one client
+    never spend the same token. A lock left by a dead process expires
+    after LOCK_TIMEOUT seconds; a request that cannot get the lock within
+    LOCK_WAIT seconds is throttled rather than let through unchecked.
+    """
+    LOCK_TIMEOUT = 1
+    LOCK_WAIT = 0.2
+    LOCK_POLL = 0.002
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, refill):
+        key = 'throttle:' + key
+        if not self._lock(key):
+            return False, 0
+        try:
+            state, allowed, tokens = _take(
+                self.cache.get(key),
+                capacity,
+                refill,
+                time.time()
+            )
+            # an untouched bucket is full again after capacity / refill s
+            self.cache.set(key, state, int(capacity / refill) + 1)
+        finally:
+            self.cache.delete(key + ':lock')
+        return allowed, tokens
+
+    def _lock(self, key):
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not self.cache.add(key + ':lock', 1, self.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.LOCK_POLL)
+        return True
+
+
+local_buckets = LocalBucketStore()
+
+
+def get_bucket_store():
+    """Return the store of THROTTLE_CACHE, or the in-process one"""
+    if settings.THROTTLE_CACHE:
+        return CacheBucketStore(caches[settings.THROTTLE_CACHE])
+    return local_buckets
+
+
+class ScopedBucketThrottle(BaseThrottle):
+    """Token bucket throttle per user, or per IP for anonymous requests
+
+    The budget is THROTTLE_RATES[scope], where the scope is the view's
+    `throttle_scope` (e.g. set on upload actions), else 'read' for safe
+    methods and 'write' for the others. The state of the bucket is left
+    on the request for RateLimitMiddleware.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            scope = 'read' if request.method in ('GET', 'HEAD', 'OPTIONS') \
+                else 'write'
+        rate = settings.THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        capacity, self.refill = parse_rate(rate)
+        allowed, self.tokens = get_bucket_store().take(
+            f'{scope}:{ident}',
+            capacity,
+            self.refill
+        )
+
+        limit = (capacity, int(self.tokens), (capacity - self.tokens)
+                 / self.refill)
+        current = getattr(request._request, 'rate_limit', None)
+        if current is None or limit[1] < current[1]:
+            request._request.rate_limit = limit
+        return allowed
+
+    def wait(self):
+        return (1 - self.tokens) / self.refill
+
+
+class RateLimitMiddleware:
+    """Add the X-RateLimit-* headers of the throttled requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        limit = getattr(request, 'rate_limit', None)
+        if limit is not None:
+            capacity, remaining, reset = limit
+            response['X-RateLimit-Limit'] = capacity
+            response['X-RateLimit-Remaining'] = remaining
+            response['X-RateLimit-Reset'] = math.ceil(reset)
+        return response
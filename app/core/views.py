@@ -0,0 +1,171 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, \
+                        HttpResponseForbidden
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from core.metrics import render_metrics
+from core.models import UPLOAD_PARTIAL_DIR
+
+# names written by ContentAddressedStorage, whose content never changes
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{64})\.[a-z0-9]+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+BLOCK_SIZE = 64 * 1024
+
+
+class FileRange:
+    """File-like object reading `length` bytes of a file from `start`
+
+    It keeps the file's fileno(), so WSGI servers whose file_wrapper uses
+    sendfile() (gunicorn) still send the range without copying it through
+    Python, bounded by the response Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file of MEDIA_ROOT, or have the front proxy serve it
+
+    With MEDIA_SERVE_MODE 'accel' or 'sendfile' the response only carries
+    an X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd) header
+    and the proxy sends the bytes. Otherwise the file is streamed with
+    support for conditional and single Range requests. Content addressed
+    names are cached as immutable.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    parts = path.split('/')
+    if any(part.startswith('.') for part in parts) or \
+            path.startswith(UPLOAD_PARTIAL_DIR + '/'):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    hashed = HASHED_NAME.search(path)
+    if hashed:
+        etag = quote_etag(hashed.group(1))
+        cache_control = IMMUTABLE
+    else:
+        etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type = mimetypes.guess_type(path)[0] or \
+            'application/octet-stream'
+        if settings.MEDIA_SERVE_MODE == 'accel':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = \
+                settings.MEDIA_ACCEL_PREFIX + quote(path)
+        elif settings.MEDIA_SERVE_MODE == 'sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = os.path.abspath(full_path)
+        else:
+            response = _file_response(request, full_path, stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+@require_safe
+def metrics(request):
+    """Serve the request histograms in the Prometheus text format
+
+    Scrapers send METRICS_TOKEN as a bearer token. Without a token the
+    endpoint is only shown to staff users logged in to the admin.
+    """
+    if not settings.METRICS_TOKEN:
+        if not request.user.is_staff:
+            raise Http404
+    elif not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def _file_response(request, full_path, size, etag):
+    """Stream the file, or the part of it a Range header asks for"""
+    byte_range = None
+    if request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range == ():
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1))
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _parse_range(header, size):
+    """Return the (first, last) bytes of a single range header
+
+    None means the header is absent or not supported, so the whole file
+    is sent; an empty tuple means the range can not be satisfied.
+    """
+    match = RANGE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        return (size - length, size - 1) if length else ()
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        return ()
+    return first, last
@@ -0,0 +1,54 @@
+"""Gunicorn settings of the production server, read from the environment
+
+    gunicorn -c gunicorn.conf.py app.wsgi:application
+
+Each worker is a process with its own database connections (one per
+thread), token cache, password hash pool and image worker pool, so
+WEB_WORKERS multiplies their sizes. Send HUP to the master to reload the
+code gracefully: new workers are started before the old ones finish
+their requests.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+
+# gunicorn's usual starting point, not measured for this app (see load
+# testing in the README); with WEB_THREADS > 1 the gthread
+# worker serves requests of a process concurrently, which helps while
+# they wait on the database
+workers = int(os.environ.get('WEB_WORKERS',
+                             multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 1))
+worker_class = os.environ.get(
+    'WEB_WORKER_CLASS',
+    'gthread' if threads > 1 else 'sync'
+)
+
+# import the application once in the master and fork it, which starts
+# workers faster and shares memory, but HUP then cannot reload the code
+preload_app = os.environ.get('WEB_PRELOAD', '0') == '1'
+reload = os.environ.get('WEB_RELOAD', '0') == '1'
+
+# recycle workers after a number of requests, jittered so that they do
+# not all restart at once, to bound slow memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop the connections the preloaded master may have opened
+
+    Without preloading Django is only imported by the worker, after the
+    fork, and there is nothing to drop.
+    """
+    if server.cfg.preload_app:
+        from django import db
+        db.connections.close_all()
@@ -0,0 +1,308 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import invalidate_user_lists
+
+
+class BulkHandler:
+    """Validate and write a list payload of user owned objects
+
+    Every item is validated before anything is written and the errors
+    are reported per item, in payload order. The writes for the whole
+    payload then run in one transaction with a constant number of
+    queries: `bulk_create`/`bulk_update` for the rows and one query per
+    relation for the referenced ids and the through table rows.
+    """
+    # field name -> (related model, through model, through column)
+    relations = {}
+
+    def __init__(self, user, serializer_class):
+        self.user = user
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.batch_size = settings.BULK_BATCH_SIZE
+
+    def create(self, items):
+        """Create an object for each item and return them"""
+        data, errors = self._validate(items)
+        with transaction.atomic():
+            self._check(data, errors)
+            self._raise_for(errors)
+            objs = self.model.objects.bulk_create(
+                [self.model(user=self.user, **self._fields(item))
+                 for item in data],
+                batch_size=self.batch_size
+            )
+            self._link(objs, data)
+            self.index([obj.pk for obj in objs])
+        invalidate_user_lists(self.user.id)
+        return objs
+
+    def update(self, items):
+        """Apply the items to the objects matching their ids"""
+        data, errors = self._validate(items, partial=True)
+        with transaction.atomic():
+            instances = self.model.objects.select_for_update().filter(
+                user=self.user
+            ).in_bulk([item['id'] for item in data if item])
+            self._check(data, errors, instances)
+            self._raise_for(errors)
+
+            objs = [instances[item['id']] for item in data]
+            fields = set()
+            for obj, item in zip(objs, data):
+                for name, value in self._fields(item).items():
+                    setattr(obj, name, value)
+                    fields.add(name)
+            if fields:
+                self.model.objects.bulk_update(
+                    objs,
+                    fields,
+                    batch_size=self.batch_size
+                )
+            self._link(objs, data, replace=True)
+            self.touch([obj.pk for obj in objs])
+        invalidate_user_lists(self.user.id)
+        return objs
+
+    def delete(self, ids):
+        """Delete the objects with the given ids"""
+        if not isinstance(ids, list):
+            raise ValidationError(
+                {'non_field_errors': [_('expected a list of ids')]}
+            )
+        self._check_size(ids)
+        id_field = serializers.IntegerField(min_value=1)
+        errors = []
+        for pk in ids:
+            try:
+                id_field.run_validation(pk)
+                errors.append({})
+            except ValidationError as exc:
+                errors.append({'id': exc.detail})
+        self._raise_for(errors)
+
+        with transaction.atomic():
+            queryset = self.model.objects.filter(user=self.user, pk__in=ids)
+            found = set(queryset.values_list('pk', flat=True))
+            self._raise_for([
+                {} if pk in found else {'id': [_('not found')]}
+                for pk in ids
+            ])
+            queryset.delete()
+
+    def touch(self, ids):
+        """Refresh the versions and search vectors of affected recipes"""
+        field = {Tag: 'tags', Ingredient: 'ingredients'}[self.model]
+        recipes = Recipe.objects.filter(**{f'{field}__in': ids})
+        recipes.touch()
+        recipes.update_search()
+
+    def index(self, ids):
+        """Compute what derives from the created objects"""
+
+    def _validate(self, items, partial=False):
+        """Validate the items on their own
+
+        Returns the validated items, None for invalid ones, and the list
+        of per item errors.
+        """
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {'non_field_errors': [_('expected a non-empty list')]}
+            )
+        self._check_size(items)
+
+        child = self.serializer_class(partial=partial)
+        id_field = serializers.IntegerField(min_value=1)
+        data, errors, seen = [], [], set()
+        for item in items:
+            item_errors = {}
+            try:
+                validated = dict(child.run_validation(item))
+            except ValidationError as exc:
+                validated, item_errors = None, exc.detail
+
+            if partial:
+                pk = item.get('id', empty) if isinstance(item, dict) else empty
+                try:
+                    pk = id_field.run_validation(pk)
+                except ValidationError as exc:
+                    item_errors['id'] = exc.detail
+                else:
+                    if pk in seen:
+                        item_errors['id'] = [_('duplicate id')]
+                    elif validated is not None:
+                        validated['id'] = pk
+                    seen.add(pk)
+
+            data.append(None if item_errors else validated)
+            errors.append(item_errors)
+        return data, errors
+
+    def _check(self, data, errors, instances=None):
+        """Add the errors found against the database to the item errors"""
+        self._check_relations(data, errors, instances)
+
+    def _check_relations(self, data, errors, instances=None):
+        """Add errors for ids that do not exist or belong to another user"""
+        checked = _valid_items(data, errors)
+        if instances is not None:
+            for item, item_errors in checked:
+                if item['id'] not in instances:
+                    item_errors['id'] = [_('not found')]
+
+        for field, (related, through, column) in self.relations.items():
+            wanted = {
+                pk for item, item_errors in checked
+                for pk in item.get(field, ())
+            }
+            if not wanted:
+                continue
+            found = set(related.objects.filter(
+                user=self.user,
+                pk__in=wanted
+            ).values_list('pk', flat=True))
+            for item, item_errors in checked:
+                missing = sorted(set(item.get(field, ())) - found)
+                if missing:
+                    item_errors[field] = [
+                        _('unknown ids: %(ids)s') % {
+                            'ids': ', '.join(map(str, missing))
+                        }
+                    ]
+
+    def _link(self, objs, data, replace=False):
+        """Write the through table rows of the items' relations"""
+        for field, (related, through, column) in self.relations.items():
+            changed = [
+                (obj, item[field]) for obj, item in zip(objs, data)
+                if field in item
+            ]
+            if not changed:
+                continue
+            if replace:
+                through.objects.filter(
+                    recipe_id__in=[obj.pk for obj, ids in changed]
+                ).delete()
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=obj.pk, **{column: pk})
+                    for obj, ids in changed
+                    for pk in dict.fromkeys(ids)
+                ],
+                batch_size=self.batch_size
+            )
+
+    def _fields(self, item):
+        return {
+            name: value for name, value in item.items()
+            if name != 'id' and name not in self.relations
+        }
+
+    def _check_size(self, items):
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                _('at most %(count)d items can be sent at once') % {
+                    'count': settings.BULK_MAX_ITEMS
+                }
+            ]})
+
+    def _raise_for(self, errors):
+        if any(errors):
+            raise ValidationError(errors)
+
+
+class RecipeAttrBulkHandler(BulkHandler):
+    """Bulk handler for tags and ingredients, whose names are unique"""
+
+    def _check(self, data, errors, instances=None):
+        super()._check(data, errors, instances)
+        self._check_names(data, errors)
+
+    def _check_names(self, data, errors):
+        """Add errors for names used twice or by another object, in any case"""
+        checked = [
+            (item, item_errors) for item, item_errors
+            in _valid_items(data, errors) if 'name' in item
+        ]
+        if not checked:
+            return
+        matches = self.model.objects.match_names(
+            self.user,
+            [item['name'] for item, item_errors in checked]
+        )
+        names = set()
+        for item, item_errors in checked:
+            lower_name, pk = matches[item['name']]
+            if lower_name in names:
+                item_errors['name'] = [_('duplicate name')]
+            names.add(lower_name)
+            if pk is not None and pk != item.get('id'):
+                item_errors['name'] = [_('already exists')]
+
+
+class RecipeBulkHandler(BulkHandler):
+    """Bulk handler for recipes and their tag and ingredient links"""
+    relations = {
+        'tags': (Tag, Recipe.tags.through, 'tag_id'),
+        'ingredients': (Ingredient, Recipe.ingredients.through,
+                        'ingredient_id'),
+    }
+
+    def touch(self, ids):
+        recipes = Recipe.objects.filter(pk__in=ids)
+        recipes.touch()
+        recipes.update_search()
+
+    def index(self, ids):
+        Recipe.objects.filter(pk__in=ids).update_search()
+
+
+def _valid_items(data, errors):
+    """Return the (item, errors) pairs of the items that passed validation"""
+    return [
+        (item, item_errors) for item, item_errors in zip(data, errors)
+        if item is not None
+    ]
+
+
+class BulkModelMixin:
+    """Add a `bulk` list route creating, updating or deleting many objects
+
+    POST creates the items, PATCH updates the items by id and DELETE
+    deletes the ids in the body.
+    """
+    bulk_handler_class = BulkHandler
+    bulk_serializer_class = None
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        """Create, update or delete objects from a list payload"""
+        handler = self.bulk_handler_class(
+            request.user,
+            self.bulk_serializer_class or self.get_serializer_class()
+        )
+        if request.method == 'DELETE':
+            handler.delete(request.data)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == 'POST':
+            objs = handler.create(request.data)
+            code = status.HTTP_201_CREATED
+        else:
+            objs = handler.update(request.data)
+            code = status.HTTP_200_OK
+        return Response(self.get_bulk_response_data(objs), status=code)
+
+    def get_bulk_response_data(self, objs):
+        """Serialize the created or updated objects"""
+        return self.get_serializer(objs, many=True).data
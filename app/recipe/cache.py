@@ -0,0 +1,113 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, \
+                              patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.response import Response
+
+
+def get_cache():
+    """Return the cache backing the tag and ingredient lists"""
+    return caches[settings.RECIPE_LIST_CACHE_ALIAS]
+
+
+def _generation_key(user_id):
+    return f'recipe:lists:{user_id}:generation'
+
+
+def get_generation(user_id):
+    """Return the token that namespaces the user's cached lists"""
+    cache = get_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_user_lists(user_id):
+    """Drop every cached list of the user by moving to a new generation
+
+    A random token is used rather than a counter so that a generation key
+    evicted by the backend can never come back with an old value.
+    """
+    get_cache().set(_generation_key(user_id), uuid.uuid4().hex, None)
+
+
+def list_cache_key(user_id, basename, query_params):
+    """Return the cache key of a list response"""
+    params = '&'.join(
+        f'{name}={value}'
+        for name, values in sorted(query_params.lists())
+        for value in values
+    )
+    digest = hashlib.md5(params.encode()).hexdigest()
+    generation = get_generation(user_id)
+    return f'recipe:lists:{user_id}:{generation}:{basename}:{digest}'
+
+
+def make_etag(data):
+    """Return a quoted ETag for the serialized response data"""
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return quote_etag(hashlib.md5(content.encode()).hexdigest())
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a 304 response when the request's validators still match
+
+    Returns None when the client has no valid copy and a full response
+    has to be built. `last_modified` is a datetime.
+    """
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timestamp
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """Set the ETag and Last-Modified headers of a private response"""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+
+class CachedListMixin:
+    """Serve list responses from a per user cache with ETag support
+
+    Entries are invalidated from the signal handlers in `recipe.signals`
+    whenever the user's tags, ingredients or recipe links change.
+    """
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = list_cache_key(
+            request.user.id,
+            self.basename,
+            request.query_params
+        )
+        entry = cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            entry = (make_etag(response.data), response.data)
+            cache.set(key, entry, settings.RECIPE_LIST_CACHE_TIMEOUT)
+
+        etag, data = entry
+        response = conditional_response(request, etag)
+        if response is None:
+            response = Response(data)
+            set_validators(response, etag)
+        return response
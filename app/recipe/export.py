@@ -0,0 +1,82 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Recipe
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+
+
+def iter_recipes(queryset, chunk_size):
+    """Yield recipes as dicts with their tags and ingredients inlined
+
+    Rows are read through a server side cursor and the related names are
+    fetched once per chunk, so memory use and the number of queries only
+    depend on the chunk size. All of them are read from the database of
+    the queryset.
+    """
+    rows = queryset.order_by('pk').values(*EXPORT_FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        tags = _related(Recipe.tags.through, 'tag', ids, queryset.db)
+        ingredients = _related(
+            Recipe.ingredients.through, 'ingredient', ids, queryset.db
+        )
+        for row in chunk:
+            row['tags'] = tags[row['id']]
+            row['ingredients'] = ingredients[row['id']]
+            yield row
+
+
+def _related(through, field, ids, using):
+    """Map recipe ids to the id and name of their related objects"""
+    related = defaultdict(list)
+    links = through.objects.using(using).filter(
+        recipe_id__in=ids
+    ).values_list(
+        'recipe_id',
+        f'{field}_id',
+        f'{field}__name'
+    ).order_by(f'{field}__name')
+    for recipe_id, pk, name in links:
+        related[recipe_id].append({'id': pk, 'name': name})
+    return related
+
+
+def to_ndjson(recipes):
+    """Render recipes as newline delimited JSON"""
+    for recipe in recipes:
+        yield json.dumps(recipe, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+    def write(self, value):
+        return value
+
+
+def to_csv(recipes):
+    """Render recipes as CSV, joining tag and ingredient names with |"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS + ('tags', 'ingredients'))
+    for recipe in recipes:
+        yield writer.writerow(
+            [recipe[field] for field in EXPORT_FIELDS] + [
+                '|'.join(tag['name'] for tag in recipe['tags']),
+                '|'.join(item['name'] for item in recipe['ingredients']),
+            ]
+        )
+
+
+EXPORT_FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
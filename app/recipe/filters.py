@@ -0,0 +1,241 @@
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+                                           TrigramSimilarity
+from django.db import connections
+from django.db.models import Count, DecimalField, F, Q
+from django.db.models.functions import Cast
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Tag, Ingredient, Recipe
+
+MAX_FILTER_IDS = 100
+MAX_SEARCH_LENGTH = 200
+
+# database alias -> whether pg_trgm is installed
+_trigram = {}
+_trigram_lock = threading.Lock()
+
+
+def parse_id_list(value, param):
+    """Convert a comma separated string of ids to a sorted list of ints"""
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id.strip()}
+    except ValueError:
+        raise ValidationError(
+            {param: _('expected a comma separated list of ids')}
+        )
+    if not ids or min(ids) < 1:
+        raise ValidationError({param: _('ids must be positive integers')})
+    if len(ids) > MAX_FILTER_IDS:
+        raise ValidationError({
+            param: _('at most %(count)d ids can be given') % {
+                'count': MAX_FILTER_IDS
+            }
+        })
+    return sorted(ids)
+
+
+def parse_name_list(value, param, allowed):
+    """Convert a comma separated string of names to a list of allowed ones"""
+    names = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValidationError({param: _(
+            'unknown names %(unknown)s, expected some of %(allowed)s'
+        ) % {'unknown': ', '.join(unknown), 'allowed': ', '.join(allowed)}})
+    return names
+
+
+def parse_flag(value, param):
+    """Convert a 0/1 query parameter to a boolean"""
+    if value in (None, '', '0'):
+        return False
+    if value == '1':
+        return True
+    raise ValidationError({param: _('expected 0 or 1')})
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+    """Filter recipes by tag and ingredient ids
+
+    `tags` and `ingredients` match recipes linked to any of the ids,
+    `tags_all` and `ingredients_all` match recipes linked to all of them.
+    Both are semi-joins against the through tables, so a recipe is never
+    returned twice however many of the ids it matches.
+    """
+    relations = (
+        ('tags', Recipe.tags.through, 'tag_id'),
+        ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        for param, through, column in self.relations:
+            any_of = request.query_params.get(param)
+            if any_of:
+                ids = parse_id_list(any_of, param)
+                links = through.objects.filter(**{f'{column}__in': ids})
+                queryset = queryset.filter(pk__in=links.values('recipe_id'))
+
+            all_of = request.query_params.get(f'{param}_all')
+            if all_of:
+                ids = parse_id_list(all_of, f'{param}_all')
+                links = through.objects.filter(
+                    **{f'{column}__in': ids}
+                ).values('recipe_id').annotate(
+                    matched=Count(column)
+                ).filter(matched=len(ids))
+                queryset = queryset.filter(pk__in=links.values('recipe_id'))
+
+        return queryset
+
+
+def has_trigram(using):
+    """Return whether the pg_trgm extension is installed, checked once"""
+    with _trigram_lock:
+        if using not in _trigram:
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+                )
+                _trigram[using] = cursor.fetchone() is not None
+        return _trigram[using]
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Full text search of recipes, best matches first
+
+    `search` matches the words of the title, tag and ingredient names
+    against the GIN indexed search vector. When pg_trgm is installed the
+    title also matches by trigram similarity, so a typo still finds the
+    recipe, and the similarity adds to the rank. RecipeOrderingFilter
+    sorts the results best first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search(request)
+        if not text:
+            return queryset
+        query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+        condition = Q(search_vector=query)
+        rank = SearchRank(F('search_vector'), query)
+        if has_trigram(queryset.db):
+            condition |= Q(title__trigram_similar=text)
+            rank = rank + TrigramSimilarity('title', text)
+        # ts_rank is a real: a fixed precision numeric goes in and out of
+        # the cursor exactly, and ties are paged by id
+        return queryset.filter(condition).annotate(
+            rank=Cast(rank, DecimalField(max_digits=12, decimal_places=6))
+        )
+
+    @staticmethod
+    def get_search(request):
+        text = request.query_params.get('search', '').strip()
+        if len(text) > MAX_SEARCH_LENGTH:
+            raise ValidationError({'search': _(
+                'at most %(count)d characters can be given'
+            ) % {'count': MAX_SEARCH_LENGTH}})
+        return text
+
+
+class RecipeRangeFilter(BaseFilterBackend):
+    """Filter recipes by preparation time and price
+
+    `max_time` keeps recipes taking at most that many minutes,
+    `min_price` and `max_price` bound the price. Each is served by a
+    (user, column, id) index.
+    """
+    params = (
+        ('max_time', 'time_minutes__lte',
+         serializers.IntegerField(min_value=0)),
+        ('min_price', 'price__gte',
+         serializers.DecimalField(max_digits=5, decimal_places=2,
+                                  min_value=0)),
+        ('max_price', 'price__lte',
+         serializers.DecimalField(max_digits=5, decimal_places=2,
+                                  min_value=0)),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        for param, lookup, field in self.params:
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    value = field.run_validation(value)
+                except ValidationError as exc:
+                    raise ValidationError({param: exc.detail})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class RecipeOrderingFilter(BaseFilterBackend):
+    """Sort recipes by one of the whitelisted `ordering` keys
+
+    The id breaks ties so that the cursor pagination, which reads the
+    ordering from here, pages through equal values in a stable order.
+    Without `ordering`, searches come best match first and other lists
+    newest first.
+    """
+    orderings = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'time_minutes': ('time_minutes', 'id'),
+        '-time_minutes': ('-time_minutes', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+    }
+    search_ordering = ('-rank', '-id')
+
+    def filter_queryset(self, request, queryset, view):
+        # the cursor pagination orders the page again, not a list that
+        # is not paginated
+        return queryset.order_by(
+            *self.get_ordering(request, queryset, view)
+        )
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get('ordering')
+        if key:
+            try:
+                return self.orderings[key]
+            except KeyError:
+                raise ValidationError({'ordering': _(
+                    'expected one of %(keys)s'
+                ) % {'keys': ', '.join(self.orderings)}})
+        if RecipeSearchFilter.get_search(request):
+            return self.search_ordering
+        if view.pagination_class is None:
+            return ('-id',)
+        ordering = view.pagination_class.ordering
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class AssignedOnlyFilter(BaseFilterBackend):
+    """Limit tags or ingredients to the ones assigned to a recipe
+
+    Written as a semi-join against the through table rather than a join
+    on `recipe__isnull=False`, which returns one row per recipe link and
+    then needs a DISTINCT over all of them.
+    """
+    relations = {
+        Tag: (Recipe.tags.through, 'tag_id'),
+        Ingredient: (Recipe.ingredients.through, 'ingredient_id'),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        assigned_only = parse_flag(
+            request.query_params.get('assigned_only'),
+            'assigned_only'
+        )
+        if not assigned_only:
+            return queryset
+
+        through, column = self.relations[queryset.model]
+        return queryset.filter(pk__in=through.objects.values(column))
@@ -0,0 +1,179 @@
+import logging
+import os
+import threading
+from concurrent.futures import BrokenExecutor, Future, \
+                               ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from PIL import Image, ImageOps
+
+from core.models import ImageBlob, Recipe, recipe_image_storage
+
+logger = logging.getLogger(__name__)
+
+# model field -> (longest side in pixels, Pillow format, file extension)
+VARIANTS = {
+    'image_thumbnail': (200, 'JPEG', 'jpg'),
+    'image_medium': (800, 'JPEG', 'jpg'),
+    'image_webp': (800, 'WEBP', 'webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the pool running the image jobs, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if settings.IMAGE_WORKER_MODE == 'process':
+                _executor = ProcessPoolExecutor(
+                    settings.IMAGE_WORKERS,
+                    initializer=_init_worker
+                )
+            else:
+                _executor = ThreadPoolExecutor(
+                    settings.IMAGE_WORKERS,
+                    thread_name_prefix='recipe-images'
+                )
+        return _executor
+
+
+def _init_worker():
+    """Set up Django in worker processes that were not forked"""
+    django.setup()
+
+
+# Image.info keys of metadata that may identify the author or the place
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'photoshop', 'comment')
+# Image.info keys kept when an original is stripped of its metadata
+RENDERING_KEYS = ('icc_profile', 'transparency')
+
+
+def render_variants(name):
+    """Write the resized renditions of a stored image and return their names
+
+    Runs in the worker, so it only touches the storage, never the
+    database. The renditions are re-encoded from the pixels, which drops
+    the EXIF data (location included) after applying its orientation.
+    An original carrying such metadata is re-encoded the same way, at
+    full size in its own format, and returned as `image`. GIFs are kept
+    as they are, re-encoding would drop their animation.
+    """
+    with recipe_image_storage.open(name) as source:
+        image = Image.open(source)
+        strip = image.format != 'GIF' and any(
+            key in image.info for key in METADATA_KEYS
+        )
+        if not strip:
+            # let JPEG decode at a reduced scale, a phone photo does not
+            # need to be fully decoded to produce an 800px rendition
+            largest = max(size for size, fmt, ext in VARIANTS.values())
+            image.draft('RGB', (largest, largest))
+        fmt = image.format
+        image = ImageOps.exif_transpose(image)
+
+    base, extension = os.path.splitext(name)
+    names = {}
+    if strip:
+        image.info = {
+            key: image.info[key] for key in RENDERING_KEYS
+            if key in image.info
+        }
+        buffer = BytesIO()
+        image.save(buffer, fmt, quality=settings.IMAGE_QUALITY,
+                   **image.info)
+        names['image'] = recipe_image_storage.save(
+            f'{base}{extension}',
+            ContentFile(buffer.getvalue())
+        )
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    for field, (size, fmt, ext) in VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        variant.save(buffer, fmt, quality=settings.IMAGE_QUALITY)
+        names[field] = recipe_image_storage.save(
+            f'{base}_{field[len("image_"):]}.{ext}',
+            ContentFile(buffer.getvalue())
+        )
+    return names
+
+
+def process_image(recipe):
+    """Render the variants of the recipe's image once the upload commits"""
+    transaction.on_commit(partial(_submit, recipe.pk, recipe.image.name))
+
+
+def _submit(pk, name):
+    if settings.IMAGE_WORKER_MODE != 'sync':
+        try:
+            future = get_executor().submit(render_variants, name)
+        except (BrokenExecutor, RuntimeError):
+            # a worker died or the pool was shut down: start a new pool
+            # for the next uploads and render this one in the request
+            logger.warning('The image pool is unavailable, rendering %s '
+                           'in the request', name)
+            _discard_executor()
+        else:
+            future.add_done_callback(partial(_finish, pk, name))
+            return
+    render_image(pk, name)
+
+
+def _discard_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def render_image(pk, name):
+    """Render the variants of a recipe's image in this thread"""
+    future = Future()
+    try:
+        future.set_result(render_variants(name))
+    except Exception as exc:
+        future.set_exception(exc)
+    _finish(pk, name, future)
+
+
+def _finish(pk, name, future):
+    """Record the rendered variants unless the image changed meanwhile
+
+    A stripped original replaces the uploaded image. Replaced files may
+    be shared with other recipes, they are only uncounted here and left
+    to the gc_images command.
+    """
+    close_old_connections()
+    recipes = Recipe.objects.filter(pk=pk, image=name)
+    try:
+        names = future.result()
+    except BrokenExecutor:
+        # the job may not be the one that broke the pool, leave it to
+        # the requeue_images command, the next upload replaces the pool
+        logger.warning('The image pool broke while rendering %s', name)
+        return
+    except Exception:
+        logger.exception('Rendering the variants of %s failed', name)
+        recipes.touch(image_status=Recipe.IMAGE_FAILED)
+        return
+
+    with transaction.atomic():
+        previous = recipes.select_for_update().values(*names).first()
+        if previous is not None:
+            recipes.touch(image_status=Recipe.IMAGE_READY, **names)
+            ImageBlob.objects.update_references(
+                added=names.values(),
+                removed=previous.values()
+            )
@@ -0,0 +1,245 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import invalidate_user_lists
+from recipe.serializers import RecipeImportSerializer
+
+
+INVALID_UTF8 = ValidationError({'non_field_errors': ['invalid UTF-8']})
+
+
+def _decode(lines):
+    """Decode lines as UTF-8, keeping invalid bytes as lone surrogates"""
+    for line in lines:
+        yield line.decode('utf-8', 'surrogateescape') \
+            if isinstance(line, bytes) else line
+
+
+def _is_utf8(value):
+    """Return whether a decoded value had no invalid bytes"""
+    if isinstance(value, list):
+        return all(_is_utf8(item) for item in value)
+    try:
+        value is None or value.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def parse_ndjson(lines):
+    """Yield (line number, record) pairs from newline delimited JSON
+
+    Lines that are not valid UTF-8 yield a ValidationError as record.
+    """
+    for number, line in enumerate(_decode(lines), 1):
+        if not line.strip():
+            continue
+        if not _is_utf8(line):
+            yield number, INVALID_UTF8
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def parse_csv(lines):
+    """Yield (line number, record) pairs from CSV with a header row
+
+    Records that are not valid UTF-8 yield a ValidationError as record.
+    """
+    reader = csv.DictReader(_decode(lines))
+    for record in reader:
+        if not all(_is_utf8(key) and _is_utf8(value)
+                   for key, value in record.items()):
+            record = INVALID_UTF8
+        yield reader.line_num, record
+
+
+PARSERS = {
+    'ndjson': parse_ndjson,
+    'csv': parse_csv,
+}
+
+
+def _names(value):
+    """Return the names of a tags/ingredients value of a record
+
+    Accepts a list of names, a list of objects with a name as written by
+    the export, or a string of names separated by |.
+    """
+    if isinstance(value, str):
+        return [name for name in value.split('|') if name]
+    if isinstance(value, list):
+        return [
+            item.get('name') if isinstance(item, dict) else item
+            for item in value
+        ]
+    return value
+
+
+class ImportResult:
+    """Counters of an import run"""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+class RecipeImporter:
+    """Import recipe records for a user in batches
+
+    Each batch is validated, its tag and ingredient names are resolved to
+    ids through a case insensitive name -> id map kept for the whole run
+    (creating the missing ones with bulk_create), and the recipes and their
+    through table rows are inserted with bulk_create in a single
+    transaction.
+    Invalid records are skipped and reported with their line number.
+    """
+
+    def __init__(self, user, batch_size=None):
+        self.user = user
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.ids = {Tag: {}, Ingredient: {}}
+        self.serializer = RecipeImportSerializer()
+
+    def run(self, records, progress=None):
+        """Import (line number, record) pairs and return an ImportResult
+
+        `progress` is called with the result after every batch.
+        """
+        result = ImportResult()
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self._import_batch(batch, result)
+            result.seconds = time.perf_counter() - result.started
+            if progress:
+                progress(result)
+        if result.imported:
+            invalidate_user_lists(self.user.id)
+        return result
+
+    def _import_batch(self, batch, result):
+        data = []
+        for number, record in batch:
+            try:
+                if isinstance(record, ValidationError):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValidationError({'non_field_errors': [
+                        'expected a JSON object'
+                    ]})
+                record = dict(record)
+                for field in ('tags', 'ingredients'):
+                    if field in record:
+                        record[field] = _names(record[field])
+                data.append(self.serializer.run_validation(record))
+            except ValidationError as exc:
+                result.skipped += 1
+                if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+                    result.errors.append(
+                        {'line': number, 'errors': exc.detail}
+                    )
+        if not data:
+            return
+
+        with transaction.atomic():
+            tag_ids = self._resolve(Tag, data, 'tags')
+            ingredient_ids = self._resolve(Ingredient, data, 'ingredients')
+            recipes = Recipe.objects.bulk_create(
+                [
+                    Recipe(
+                        user=self.user,
+                        **{name: value for name, value in item.items()
+                           if name not in ('tags', 'ingredients')}
+                    )
+                    for item in data
+                ],
+                batch_size=self.batch_size
+            )
+            self._link(Recipe.tags.through, 'tag_id', recipes, data, 'tags',
+                       tag_ids)
+            self._link(Recipe.ingredients.through, 'ingredient_id', recipes,
+                       data, 'ingredients', ingredient_ids)
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in recipes]
+            ).update_search()
+        result.imported += len(recipes)
+
+    def _resolve(self, model, data, field):
+        """Return the name -> id map, creating the names not seen yet
+
+        Names match ignoring case, like the unique (user_id, lower(name))
+        index, and are lowered by the database only. Missing names are
+        inserted with ON CONFLICT DO NOTHING and read back, so concurrent
+        imports do not fail on each other.
+        """
+        ids = self.ids[model]
+        missing = [
+            name for item in data for name in item.get(field, ())
+            if name not in ids
+        ]
+        if missing:
+            matches = model.objects.match_names(self.user, missing)
+            ids.update(
+                (name, pk) for name, (lower_name, pk) in matches.items()
+                if pk is not None
+            )
+            new = {}
+            for name, (lower_name, pk) in matches.items():
+                if pk is None:
+                    new.setdefault(lower_name, name)
+            if new:
+                model.objects.bulk_create(
+                    [model(user=self.user, name=name)
+                     for name in new.values()],
+                    batch_size=self.batch_size,
+                    ignore_conflicts=True
+                )
+                ids.update(
+                    (name, pk) for name, (lower_name, pk) in
+                    model.objects.match_names(
+                        self.user,
+                        [name for name in matches if name not in ids]
+                    ).items()
+                )
+        return ids
+
+    def _link(self, through, column, recipes, data, field, ids):
+        through.objects.bulk_create(
+            [
+                through(recipe_id=recipe.pk, **{column: pk})
+                for recipe, item in zip(recipes, data)
+                for pk in dict.fromkeys(
+                    ids[name] for name in item.get(field, ())
+                )
+            ],
+            batch_size=self.batch_size
+        )
@@ -0,0 +1,120 @@
+import json
+
+from django.core.exceptions import ValidationError
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, \
+                                      _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination on every field of the ordering
+
+    DRF's cursor only holds the first ordering field and pages through
+    equal values with an OFFSET, which costs as much as the tie group is
+    long and skips or repeats rows when it changes. Here the cursor holds
+    the values of all the ordering fields of the last (or first) row, and
+    the next page starts with a row comparison such as
+    `(time_minutes, id) > (%s, %s)`, served by a (..., time_minutes, id)
+    index. The ordering has to end with a unique field, the id, and sort
+    every field in the same direction.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            queryset = self._after(queryset, ordering, self.cursor.position)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # an empty page after a reverse cursor: start over from the top
+        position = self._position(self.page[-1]) if self.page else None
+        return self.encode_cursor(Cursor(0, False, position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        # an empty page after a cursor: the previous page is the last one
+        position = self._position(self.page[0]) if self.page else None
+        return self.encode_cursor(Cursor(0, True, position))
+
+    def _position(self, item):
+        """Return the cursor position of a row or object, as a string"""
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(item, dict):
+            values = [item[name] for name in names]
+        else:
+            values = [getattr(item, name) for name in names]
+        return json.dumps([str(value) for value in values])
+
+    def _after(self, queryset, ordering, position):
+        """Filter the rows past a position in the order of `ordering`"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        query = queryset.query
+        compiler = query.get_compiler(using=queryset.db)
+        columns, column_params, params = [], [], []
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            if name in query.annotations:
+                expression = query.annotations[name]
+                output_field = expression.output_field
+            else:
+                output_field = queryset.model._meta.get_field(name)
+                expression = query.resolve_ref(name)
+            try:
+                value = output_field.to_python(value)
+            except (TypeError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            sql, expression_params = compiler.compile(expression)
+            columns.append(sql)
+            column_params.extend(expression_params)
+            params.append(
+                output_field.get_db_prep_value(value, compiler.connection)
+            )
+        operator = '<' if ordering[0].startswith('-') else '>'
+        return queryset.extra(where=[
+            f'({", ".join(columns)}) {operator} '
+            f'({", ".join(["%s"] * len(params))})'
+        ], params=column_params + params)
+
+
+class RecipeCursorPagination(KeysetCursorPagination):
+    """Keyset pagination for recipes, newest first"""
+    ordering = '-id'
+
+
+class RecipeAttrCursorPagination(KeysetCursorPagination):
+    """Keyset pagination for tags and ingredients by name"""
+    ordering = ('-name', '-id')
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+
+from core.metrics import serializing
+
+
+class RowSerializer:
+    """Read only serializer of `.values()` rows, built from a ModelSerializer
+
+    Gives the same representation as the ModelSerializer without building
+    bound fields for every object: each field's conversion is decided
+    once, most values are copied as is and the others (decimals, files,
+    dates) go through the DRF field's to_representation. Many to many
+    fields of ids are read from their through table, one query per
+    relation for all the rows, and list the ids by increasing id.
+    """
+    # fields whose representation of a database value is the value itself
+    verbatim = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.IntegerField,
+    )
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.accessors = []
+        self.relations = {}
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, ManyRelatedField):
+                model_field = model._meta.get_field(field.source)
+                self.relations[name] = (
+                    model_field.remote_field.through,
+                    model_field.m2m_column_name(),
+                    model_field.m2m_reverse_name()
+                )
+                self.accessors.append((name, None, None))
+                continue
+            convert = None if isinstance(field, self.verbatim) \
+                else field.to_representation
+            self.accessors.append((name, field.source, convert))
+
+    def columns(self, fields=None):
+        """Return the columns to select for the `fields` kept"""
+        return [
+            source for name, source, convert in self.accessors
+            if source is not None and (fields is None or name in fields)
+        ]
+
+    def serialize(self, rows, fields=None):
+        """Return the representation of the rows as a list of dicts"""
+        with serializing():
+            return self._serialize(rows, fields)
+
+    def _serialize(self, rows, fields):
+        accessors = [
+            accessor for accessor in self.accessors
+            if fields is None or accessor[0] in fields
+        ]
+        related = {
+            name: self._related(name, rows)
+            for name, source, convert in accessors if source is None
+        }
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in accessors:
+                if source is None:
+                    item[name] = related[name].get(row['id'], [])
+                    continue
+                value = row[source]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+    def _related(self, name, rows):
+        """Map the ids of the rows to the ids of their related objects"""
+        through, column, target = self.relations[name]
+        ids = defaultdict(list)
+        links = through.objects.filter(**{
+            f'{column}__in': [row['id'] for row in rows]
+        }).values_list(column, target).order_by(column, target)
+        for pk, related_pk in links:
+            ids[pk].append(related_pk)
+        return ids
+
+
+@lru_cache(maxsize=None)
+def row_serializer(serializer_class):
+    """Return the RowSerializer of a serializer class, built once"""
+    return RowSerializer(serializer_class)
+
+
+class RowListMixin:
+    """List from `.values()` rows serialized by a RowSerializer
+
+    The cursor pagination reads its positions from the rows, which have
+    to include the ordering columns; the default serializer fields are
+    assumed to include them.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = row_serializer(self.get_serializer_class())
+        rows = self.filter_queryset(self.get_queryset()).values(
+            *serializer.columns()
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serializer.serialize(list(rows)))
+        return self.get_paginated_response(serializer.serialize(page))
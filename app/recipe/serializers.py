@@ -1,9 +1,14 @@
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.metrics import TimedSerializerMixin
+from core.models import Tag, Ingredient, Recipe, UploadSession
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin,
+                    serializers.ModelSerializer):
     """serializer for tag objects"""
     class Meta:
         model = Tag
@@ -11,7 +16,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializer for Ingredient serializer"""
     class Meta:
         model = Ingredient
@@ -19,7 +25,25 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Serializer limited to `fields`, nesting the `expand` relations"""
+    # relation -> serializer of its objects
+    expandable = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.expandable[name](
+                many=True,
+                read_only=True
+            )
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                       serializers.ModelSerializer):
     """Serialize a recipe"""
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -29,6 +53,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    expandable = {
+        'tags': TagSerializer,
+        'ingredients': IngredientSerializer,
+    }
 
     class Meta:
         model = Recipe
@@ -44,16 +72,95 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    """Validate a recipe of a bulk payload
+
+    Tags and ingredients are plain id lists here, the bulk handler checks
+    them for the whole payload at once instead of one query per id.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = RecipeSerializer.Meta.fields
+        read_only_fields = ('id',)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Validate a recipe record of an import file"""
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'title',
+            'time_minutes',
+            'price',
+            'ingredients',
+            'tags',
+            'link'
+            )
+
+
+IMAGE_FIELDS = (
+    'image',
+    'image_status',
+    'image_thumbnail',
+    'image_medium',
+    'image_webp',
+)
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + IMAGE_FIELDS
+        read_only_fields = ('id',) + IMAGE_FIELDS
+
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """Serializer for uploading image to recipe"""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id',) + IMAGE_FIELDS
         read_only_fields = ('id',)
+
+
+class UploadSessionSerializer(TimedSerializerMixin,
+                              serializers.ModelSerializer):
+    """Serialize a resumable image upload"""
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'filename', 'size', 'offset', 'created')
+        read_only_fields = ('id', 'created')
+
+    def validate_size(self, value):
+        """Check the announced size against the upload limit"""
+        if not 0 < value <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                _('the size must be between 1 and %(max)d bytes') % {
+                    'max': settings.IMAGE_UPLOAD_MAX_SIZE
+                }
+            )
+        return value
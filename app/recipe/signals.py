@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import invalidate_user_lists
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_on_write(sender, instance, **kwargs):
+    """Invalidate cached lists when an object is created, saved or deleted
+
+    Deleting a recipe also drops its links, which changes assigned_only.
+    """
+    invalidate_user_lists(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_link_change(sender, instance, action, **kwargs):
+    """Invalidate cached lists when recipe links change assigned_only"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_user_lists(instance.user_id)
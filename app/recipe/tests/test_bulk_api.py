@@ -0,0 +1,221 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """create and return a sample recipe"""
+    defaults = {
+        'title': 'sample recipe',
+        'price': 5,
+        'time_minutes': 10
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test the bulk recipe endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulk@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Tofu'
+        )
+
+    def payload(self, count):
+        return [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes and their links in constant queries"""
+        with self.assertNumQueries(10):
+            res = self.client.post(
+                RECIPES_BULK_URL,
+                self.payload(20),
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+        self.assertEqual(
+            self.tag.recipe_set.filter(ingredients=self.ingredient).count(),
+            20
+        )
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test that one invalid item rejects the whole payload"""
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        other_tag = Tag.objects.create(user=other, name='Theirs')
+        payload = self.payload(3)
+        payload[1]['tags'] = [other_tag.id]
+        payload[2]['time_minutes'] = 'soon'
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertIn('time_minutes', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields and replacing tags of many recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe2.tags.add(self.tag)
+        payload = [
+            {'id': recipe1.id, 'title': 'Tofu scramble',
+             'tags': [self.tag.id]},
+            {'id': recipe2.id, 'tags': []},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Tofu scramble')
+        self.assertEqual(list(recipe1.tags.all()), [self.tag])
+        self.assertEqual(recipe2.tags.count(), 0)
+        self.assertEqual(recipe2.title, 'sample recipe')
+        self.assertEqual(recipe2.version, 3)
+
+    def test_bulk_update_unknown_and_duplicate_ids(self):
+        """Test that updates need existing, distinct ids"""
+        recipe = sample_recipe(user=self.user)
+        payload = [
+            {'id': recipe.id, 'title': 'a'},
+            {'id': recipe.id, 'title': 'b'},
+            {'title': 'c'},
+            {'id': recipe.id + 100, 'title': 'd'},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        for errors in res.data[1:3]:
+            self.assertIn('id', errors)
+
+        payload = [payload[0], payload[3]]
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[1])
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting recipes by id"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        kept = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            [recipe1.id, recipe2.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [kept])
+
+    def test_bulk_delete_other_users_recipe(self):
+        """Test that other users' recipes can not be deleted"""
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        recipe = sample_recipe(user=other)
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+
+class BulkTagApiTests(TestCase):
+    """Test the bulk tag endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulk@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_update_delete_tags(self):
+        """Test writing many tags at once"""
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'Vegan'}, {'name': 'Dessert'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ids = [tag['id'] for tag in res.data]
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': ids[0], 'name': 'Plant based'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.get(id=ids[0]).name, 'Plant based')
+
+        res = self.client.delete(TAGS_BULK_URL, ids, format='json')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_tags_duplicate_names(self):
+        """Test that names used twice or already taken are rejected"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'Soup'}, {'name': 'SOUP'}, {'name': 'vegan'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': tag.id, 'name': 'VEGAN'},
+             {'id': other.id, 'name': 'Vegan'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bulk_create_tags_invalid(self):
+        """Test that empty or malformed payloads are rejected"""
+        for payload in ([], [{'name': ''}], {'name': 'x'}):
+            res = self.client.post(TAGS_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
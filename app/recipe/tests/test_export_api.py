@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(TestCase):
+    """Test streaming the recipe catalogue"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'export@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'recipe {i}',
+                time_minutes=10,
+                price='5.50'
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline delimited JSON"""
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        Recipe.objects.create(user=other, title='x', time_minutes=1, price=1)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual(len(recipes), 5)
+        self.assertEqual(recipes[0]['title'], 'recipe 0')
+        self.assertEqual(recipes[0]['price'], '5.50')
+        self.assertEqual(recipes[0]['tags'][0]['name'], 'Vegan')
+        self.assertEqual(recipes[0]['ingredients'][0]['name'], 'Tofu')
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['tags'], 'Vegan')
+        self.assertEqual(rows[0]['ingredients'], 'Tofu')
+
+    def test_export_invalid_output(self):
+        """Test that unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test the related names are fetched once per chunk"""
+        with self.assertNumQueries(1 + 3 * 2):
+            res = self.client.get(EXPORT_URL)
+            lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(len(lines), 5)
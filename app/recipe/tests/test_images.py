@@ -0,0 +1,181 @@
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageBlob, Recipe
+
+# EXIF orientation tag, 6 means the camera was rotated 90 degrees
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def image_upload_url(recipe_id):
+    """return the recipe image upload url"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+@override_settings(IMAGE_WORKER_MODE='sync')
+class RecipeImageProcessingTests(TransactionTestCase):
+    """Test rendering the variants of uploaded recipe images"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'images@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=30,
+            price=5
+        )
+
+    def upload(self, image, **params):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            image.save(ntf, format='JPEG', **params)
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+
+    def test_variants_rendered(self):
+        """Test the variants are resized, rotated and stripped of EXIF"""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+
+        res = self.upload(Image.new('RGB', (1600, 1200)), exif=exif.tobytes())
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.version, 3)
+        expected = {
+            'image_thumbnail': ('JPEG', (150, 200)),
+            'image_medium': ('JPEG', (600, 800)),
+            'image_webp': ('WEBP', (600, 800)),
+        }
+        for field, (fmt, size) in expected.items():
+            with getattr(self.recipe, field).open() as variant:
+                image = Image.open(variant)
+                self.assertEqual(image.format, fmt)
+                self.assertEqual(image.size, size)
+                self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_original_stripped(self):
+        """Test the original is rotated and stripped of EXIF"""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[MAKE] = 'Phone'
+
+        self.upload(Image.new('RGB', (1000, 900)), exif=exif.tobytes())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        with self.recipe.image.open() as original:
+            image = Image.open(original)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (900, 1000))
+            self.assertNotIn('exif', image.info)
+        blobs = dict(ImageBlob.objects.values_list('name', 'references'))
+        self.assertEqual(blobs[self.recipe.image.name], 1)
+        self.assertEqual(sorted(blobs.values()), [0, 1, 1, 1, 1])
+
+    def test_new_upload_uncounts_variants(self):
+        """Test the variants of a replaced image lose their reference"""
+        self.upload(Image.new('RGB', (300, 300), 'red'))
+        self.recipe.refresh_from_db()
+        old = self.recipe.image_thumbnail.name
+        self.assertEqual(ImageBlob.objects.get(name=old).references, 1)
+
+        self.upload(Image.new('RGB', (300, 300), 'blue'))
+
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image_thumbnail.name, old)
+        self.assertEqual(ImageBlob.objects.get(name=old).references, 0)
+        self.assertEqual(
+            ImageBlob.objects.get(
+                name=self.recipe.image_thumbnail.name
+            ).references,
+            1
+        )
+
+    @patch('recipe.images.render_variants', side_effect=OSError)
+    def test_failed_rendering_recorded(self, render_variants):
+        """Test a failed rendering is recorded on the recipe"""
+        with self.assertLogs('recipe.images', 'ERROR'):
+            self.upload(Image.new('RGB', (10, 10)))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertFalse(self.recipe.image_thumbnail)
+
+    @override_settings(IMAGE_WORKER_MODE='process')
+    @patch('recipe.images.get_executor')
+    def test_broken_pool_renders_in_request(self, get_executor):
+        """Test the image is rendered in the request without a pool"""
+        get_executor.return_value = Mock(
+            submit=Mock(side_effect=BrokenProcessPool)
+        )
+        with self.assertLogs('recipe.images', 'WARNING'):
+            self.upload(Image.new('RGB', (300, 300)))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertTrue(self.recipe.image_thumbnail)
+
+    def test_requeue_lost_jobs(self):
+        """Test stale jobs are rendered again and old ones given up"""
+        with patch('recipe.images._submit'):
+            self.upload(Image.new('RGB', (300, 300)))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PROCESSING)
+        self.assertIsNotNone(self.recipe.image_queued)
+        lost = Recipe.objects.create(
+            user=self.user,
+            title='Stew',
+            time_minutes=60,
+            price=4,
+            image=self.recipe.image.name,
+            image_status=Recipe.IMAGE_PROCESSING,
+            image_queued=timezone.now() - timedelta(days=2)
+        )
+
+        out = StringIO()
+        call_command('requeue_images', stdout=out)
+        self.assertIn('rendered 0 images and marked 1 as failed',
+                      out.getvalue())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PROCESSING)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_queued=timezone.now() - timedelta(hours=1)
+        )
+        call_command('requeue_images', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertTrue(self.recipe.image_thumbnail)
+        lost.refresh_from_db()
+        self.assertEqual(lost.image_status, Recipe.IMAGE_FAILED)
@@ -0,0 +1,158 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson_file(records, name='recipes.ndjson'):
+    content = '\n'.join(json.dumps(record) for record in records)
+    return SimpleUploadedFile(name, content.encode())
+
+
+class RecipeImportApiTests(TestCase):
+    """Test importing recipes from files"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'import@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Test importing recipes and resolving tag names"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        records = [
+            {'title': 'Tofu scramble', 'time_minutes': 10, 'price': '4.00',
+             'tags': ['Vegan', 'Breakfast'], 'ingredients': ['Tofu']},
+            {'title': 'Porridge', 'time_minutes': 5, 'price': '1.00',
+             'tags': ['Breakfast']},
+        ]
+
+        res = self.client.post(IMPORT_URL, {'file': ndjson_file(records)})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        breakfast = Tag.objects.get(user=self.user, name='Breakfast')
+        self.assertEqual(breakfast.recipe_set.count(), 2)
+        recipe = Recipe.objects.get(title='Tofu scramble')
+        self.assertEqual(recipe.ingredients.get().name, 'Tofu')
+
+    def test_import_matches_names_ignoring_case(self):
+        """Test imported names reuse existing tags in any case"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        records = [
+            {'title': 'Curry', 'time_minutes': 30, 'price': '6.00',
+             'tags': ['VEGAN', 'Spicy', 'spicy']},
+        ]
+
+        res = self.client.post(IMPORT_URL, {'file': ndjson_file(records)})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(title='Curry')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Spicy', 'Vegan']
+        )
+        self.assertEqual(recipe.tags.get(name='Vegan'), tag)
+
+    def test_import_reports_invalid_lines(self):
+        """Test invalid records are skipped and reported by line"""
+        content = (
+            b'{"title": "Soup", "time_minutes": 20, "price": "3.00"}\n'
+            b'not json\n'
+            b'{"title": "Stew", "time_minutes": "long", "price": "3.00"}\n'
+        )
+        upload = SimpleUploadedFile('recipes.ndjson', content)
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.data['imported'], 1)
+        self.assertEqual(res.data['skipped'], 2)
+        self.assertEqual(
+            [error['line'] for error in res.data['errors']],
+            [2, 3]
+        )
+
+    def test_import_reports_invalid_utf8(self):
+        """Test lines that are not UTF-8 are reported, not a server error"""
+        uploads = (
+            ('recipes.ndjson',
+             b'{"title": "Soup", "time_minutes": 20, "price": "3.00"}\n'
+             b'{"title": "Cr\xe8me", "time_minutes": 20, "price": "3.00"}\n'),
+            ('recipes.csv',
+             b'title,time_minutes,price\n'
+             b'Soup,20,3.00\n'
+             b'Cr\xe8me,20,3.00\n'),
+        )
+        for name, content in uploads:
+            res = self.client.post(
+                IMPORT_URL,
+                {'file': SimpleUploadedFile(name, content)}
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(res.data['imported'], 1)
+            self.assertEqual(res.data['errors'], [{
+                'line': 2 if name.endswith('.ndjson') else 3,
+                'errors': {'non_field_errors': ['invalid UTF-8']},
+            }])
+
+    def test_import_names_lowered_by_database(self):
+        """Test names whose case folding differs in Python still import"""
+        records = [
+            {'title': 'Weißwurst', 'time_minutes': 30, 'price': '6.00',
+             'tags': ['ẞ', 'İstanbul', 'i̇stanbul']},
+        ]
+
+        res = self.client.post(IMPORT_URL, {'file': ndjson_file(records)})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(title='Weißwurst')
+        self.assertEqual(
+            recipe.tags.count(),
+            Tag.objects.filter(user=self.user).count()
+        )
+
+    def test_import_exported_csv(self):
+        """Test that a CSV export can be imported into another account"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=40,
+            price='8.00'
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice')
+        )
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+        upload = SimpleUploadedFile(
+            'recipes.csv',
+            b''.join(res.streaming_content)
+        )
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        self.client.force_authenticate(other)
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.data['imported'], 1)
+        imported = Recipe.objects.get(user=other)
+        self.assertEqual(imported.title, 'Curry')
+        self.assertEqual(imported.ingredients.get().user, other)
+
+    def test_import_without_file(self):
+        """Test that a file is required"""
+        res = self.client.post(IMPORT_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -44,7 +44,7 @@ class PrivateIngredientApiTests(TestCase):
         ingrediants = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingrediants, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_related_to_user(self):
         """test that related ingredients are returned"""
@@ -57,8 +57,8 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """test create a new ingredient"""
@@ -98,8 +98,8 @@ class PrivateIngredientApiTests(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test retrieving ingredients by assigned return unique items"""
@@ -122,4 +122,4 @@ class PrivateIngredientApiTests(TestCase):
         )
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
         recipe2.ingredients.add(ingredient)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
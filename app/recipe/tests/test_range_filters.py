@@ -0,0 +1,182 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe
+from recipe.pagination import RecipeCursorPagination
+from recipe.filters import RecipeOrderingFilter
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeRangeFilterTests(TestCase):
+    """Test filtering and ordering recipes by time and price"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'range@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title, time_minutes, price in (
+            ('Salad', 10, '4.50'),
+            ('Curry', 45, '9.00'),
+            ('Pasta', 20, '12.00'),
+            ('Soup', 20, '6.00'),
+        ):
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=time_minutes,
+                price=price
+            )
+
+    def titles(self, **params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_filter_time_and_price(self):
+        """Test under 30 minutes and under 10, cheapest first"""
+        self.assertEqual(
+            self.titles(max_time=30, max_price='10', ordering='price'),
+            ['Salad', 'Soup']
+        )
+        self.assertEqual(
+            self.titles(min_price='6', ordering='-price'),
+            ['Pasta', 'Curry', 'Soup']
+        )
+
+    @patch.object(RecipeCursorPagination, 'page_size', None)
+    def test_ordering_without_page_size(self):
+        """Test lists are ordered when no page size turns paging off"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe['title'] for recipe in res.data],
+                         ['Salad', 'Soup', 'Curry', 'Pasta'])
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual([recipe['title'] for recipe in res.data],
+                         ['Soup', 'Pasta', 'Curry', 'Salad'])
+
+    def test_ordering_breaks_ties_by_id(self):
+        """Test equal values page in a stable order"""
+        titles, url = [], RECIPES_URL + '?ordering=time_minutes&page_size=1'
+        while url:
+            res = self.client.get(url)
+            titles += [recipe['title'] for recipe in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(titles, ['Salad', 'Pasta', 'Soup', 'Curry'])
+
+    def test_ordering_pages_large_tie_group(self):
+        """Test equal values are paged by id without OFFSET"""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Tie {i}', time_minutes=15,
+                   price='5.00')
+            for i in range(25)
+        )
+        expected = list(Recipe.objects.filter(user=self.user).order_by(
+            '-time_minutes', '-id'
+        ).values_list('id', flat=True))
+
+        ids, pages = [], []
+        url = RECIPES_URL + '?ordering=-time_minutes&page_size=4'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                ids += [recipe['id'] for recipe in res.data['results']]
+                pages.append(res.data)
+                url = res.data['next']
+
+        self.assertEqual(ids, expected)
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries
+        ))
+
+        previous = [recipe['id'] for recipe in self.client.get(
+            pages[-1]['previous']
+        ).data['results']]
+        self.assertEqual(previous, [recipe['id']
+                                    for recipe in pages[-2]['results']])
+
+    def test_default_ordering(self):
+        """Test the ordering of the pagination is given as a tuple"""
+        request = Request(APIRequestFactory().get(RECIPES_URL))
+
+        ordering = RecipeOrderingFilter().get_ordering(
+            request, None, RecipeViewSet()
+        )
+
+        self.assertEqual(ordering, ('-id',))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'cD1bIngiXQ=='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_parameters(self):
+        """Test invalid values and unknown sort keys are rejected"""
+        for params in (
+            {'max_time': 'soon'},
+            {'max_time': '-1'},
+            {'min_price': 'cheap'},
+            {'max_price': '1000'},
+            {'ordering': 'title'},
+        ):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def explain_list(self, url, params=None):
+        """Return the response of a list and the plan of its recipe query"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "core_recipe" ' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        return res, plan
+
+    def test_query_plans_use_indexes(self):
+        """Test the range, ordering and cursor queries use the indexes"""
+        with connection.cursor() as cursor:
+            # the tables are tiny, make the planner show its index choice
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+        salad = Recipe.objects.get(title='Salad')
+
+        res, plan = self.explain_list(RECIPES_URL, {
+            'max_time': 30, 'ordering': 'time_minutes', 'page_size': 1,
+        })
+        self.assertIn('core_recipe_user_time_idx', plan)
+
+        res, plan = self.explain_list(res.data['next'])
+        self.assertIn('core_recipe_user_time_idx', plan)
+        self.assertIn('Index Cond', plan)
+        self.assertIn(f'ROW(time_minutes, id) > ROW(10, {salad.id})', plan)
+
+        res, plan = self.explain_list(RECIPES_URL, {
+            'max_price': 10, 'ordering': '-price', 'page_size': 1,
+        })
+        self.assertIn('core_recipe_user_price_idx', plan)
+
+        res, plan = self.explain_list(res.data['next'])
+        self.assertIn('core_recipe_user_price_idx', plan)
+        self.assertIn('ROW(price, id) < ROW(', plan)
@@ -1,17 +1,19 @@
 import tempfile
 import os
+from unittest.mock import patch
 from PIL import Image
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewSet
 from decimal import Decimal
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -80,7 +82,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for authenticated user"""
@@ -96,8 +98,71 @@ class PrivateRecipeApiTest(TestCase):
 
         recipes = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipes_paginated_by_cursor(self):
+        """Test walking the recipe list with the next cursor"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'recipe {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [recipe['id'] for recipe in res.data['results']]
+
+        expected = Recipe.objects.filter(user=self.user).order_by('-id')
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_paginated_recipes_filtered_by_tags(self):
+        """Test that pagination keeps the tags filter between pages"""
+        tag = sample_tag(user=self.user)
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'tagged {i}').tags.add(tag)
+        sample_recipe(user=self.user, title='untagged')
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id, 'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['title'], 'tagged 0')
+        self.assertIsNone(res.data['next'])
+
+    def test_filter_by_tags_returns_unique_recipes(self):
+        """Test a recipe matching several tag ids is returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes that have every given tag"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        both = sample_recipe(user=self.user, title='Vegan brownie')
+        both.tags.add(tag1, tag2)
+        sample_recipe(user=self.user, title='Lentil soup').tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags_all': f'{tag1.id},{tag2.id},{tag2.id}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Vegan brownie'])
+
+    def test_filter_by_invalid_ids(self):
+        """Test that malformed id lists are rejected"""
+        for params in ({'tags': '1,abc'}, {'ingredients_all': '0'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_view_recipe_detail(self):
         """Test viewing the recipe detail"""
@@ -204,6 +269,11 @@ class PrivateRecipeApiTest(TestCase):
 class RecipeImageUploadTest(TestCase):
 
     def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'vishwa@test.com',
@@ -224,8 +294,9 @@ class RecipeImageUploadTest(TestCase):
             ntf.seek(0)
             res = self.client.post(url, {'image': ntf}, format='multipart')
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
     def test_upload_image_bad_request(self):
@@ -253,9 +324,9 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_by_ingredients(self):
         """Test filtering recipe by ingredients"""
@@ -275,6 +346,127 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeQueryCountTest(TestCase):
+    """Test the number of queries made by the recipe endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def sample_recipes(self, count):
+        """Create recipes that each have a tag and an ingredient"""
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'ingredient {i}')
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query once per recipe"""
+        self.sample_recipes(10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_detail_query_count(self):
+        """Test retrieving a recipe prefetches its tags and ingredients"""
+        recipe = self.sample_recipes(1)[0]
+        recipe.tags.add(sample_tag(user=self.user, name='extra'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+
+
+class RecipeConditionalGetTest(TestCase):
+    """Test ETag and Last-Modified handling of the recipe endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'etag@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_detail_not_modified(self):
+        """Test a matching ETag returns 304 without serializing"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_modified_by_tag_change(self):
+        """Test adding a tag changes the recipe ETag"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['tags']), 1)
+
+    def test_detail_if_modified_since(self):
+        """Test Last-Modified can be used to revalidate a recipe"""
+        last_modified = self.client.get(
+            detail_url(self.recipe.id)
+        )['Last-Modified']
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_not_modified(self):
+        """Test the list answers 304 until one of its recipes changes"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.recipe.title = 'changed'
+        self.recipe.save()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.object(RecipeViewSet, 'pagination_class', None)
+    def test_list_not_modified_unpaginated(self):
+        """Test the list has an ETag when pagination is off"""
+        newest = sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [newest.id, self.recipe.id])
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
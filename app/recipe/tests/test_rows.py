@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.rows import row_serializer
+from recipe.serializers import RecipeSerializer, TagSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class RowSerializerTests(TestCase):
+    """Test the fast path serializers match the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'rows@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert \u2028')]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for title, price, link in (('Tart', '4.50', 'https://a.com/t'),
+                                   ('Crème brûlée', '12.05', '')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=20,
+                price=price,
+                link=link
+            )
+            recipe.tags.set(tags[::-1])
+        recipe.ingredients.add(ingredient)
+
+    def assertSameBytes(self, serializer_class, queryset, fields=None):
+        fast = row_serializer(serializer_class)
+        rows = list(queryset.values(*fast.columns(fields)))
+        expected = serializer_class(queryset, many=True).data
+        if fields is not None:
+            expected = [
+                {name: item[name] for name in item if name in fields}
+                for item in expected
+            ]
+
+        self.assertEqual(
+            JSONRenderer().render(fast.serialize(rows, fields)),
+            JSONRenderer().render(expected)
+        )
+
+    def test_same_bytes(self):
+        """Test rows render exactly as the model serializers"""
+        recipes = Recipe.objects.order_by('id').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            'ingredients'
+        )
+        self.assertSameBytes(RecipeSerializer, recipes)
+        self.assertSameBytes(RecipeSerializer, recipes, {'id', 'price'})
+        self.assertSameBytes(TagSerializer, Tag.objects.order_by('-name'))
+
+    def test_list_responses(self):
+        """Test lists read rows with one query per relation"""
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.order_by('-id').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            'ingredients'
+        )
+        self.assertEqual(
+            res.data['results'],
+            RecipeSerializer(recipes, many=True).data
+        )
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(
+            res.data['results'],
+            TagSerializer(Tag.objects.order_by('-name', '-id'),
+                          many=True).data
+        )
@@ -0,0 +1,159 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.filters import has_trigram
+from recipe.pagination import RecipeCursorPagination
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, title, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5
+    )
+    recipe.tags.set(tags)
+    recipe.ingredients.set(ingredients)
+    return recipe
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test the full text search of recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'search@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_ranks_title_first(self):
+        """Test title matches rank above ingredient matches"""
+        chicken = Ingredient.objects.create(user=self.user, name='Chicken')
+        sample_recipe(self.user, 'Green curry', ingredients=[chicken])
+        sample_recipe(self.user, 'Roast chicken')
+        sample_recipe(self.user, 'Lemon tart')
+
+        self.assertEqual(
+            self.search('chicken'),
+            ['Roast chicken', 'Green curry']
+        )
+
+    @patch.object(RecipeCursorPagination, 'page_size', None)
+    def test_search_ranks_without_page_size(self):
+        """Test results are ranked when no page size turns paging off"""
+        chicken = Ingredient.objects.create(user=self.user, name='Chicken')
+        sample_recipe(self.user, 'Roast chicken')
+        sample_recipe(self.user, 'Green curry', ingredients=[chicken])
+
+        res = self.client.get(RECIPES_URL, {'search': 'chicken'})
+
+        self.assertEqual([recipe['title'] for recipe in res.data],
+                         ['Roast chicken', 'Green curry'])
+
+    def test_search_stems_words(self):
+        """Test words match in their other forms"""
+        sample_recipe(self.user, 'Baked salmon')
+
+        self.assertEqual(self.search('baking'), ['Baked salmon'])
+
+    def test_search_follows_links_and_renames(self):
+        """Test the vectors follow tag links, renames and deletions"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user, 'Chickpea stew')
+        self.assertEqual(self.search('vegan'), [])
+
+        recipe.tags.add(tag)
+        self.assertEqual(self.search('vegan'), ['Chickpea stew'])
+
+        tag.name = 'Spicy'
+        tag.save()
+        self.assertEqual(self.search('vegan'), [])
+        self.assertEqual(self.search('spicy'), ['Chickpea stew'])
+
+        tag.delete()
+        self.assertEqual(self.search('spicy'), [])
+
+    def test_search_bulk_created_recipes(self):
+        """Test recipes created in bulk are searchable by their tags"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        res = self.client.post(
+            RECIPES_BULK_URL,
+            [{'title': 'Lemon tart', 'time_minutes': 30, 'price': '4.00',
+              'tags': [tag.id]}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.search('dessert'), ['Lemon tart'])
+
+    def test_search_own_recipes_only(self):
+        """Test the search is limited to the user's recipes"""
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        sample_recipe(other, 'Roast chicken')
+
+        self.assertEqual(self.search('chicken'), [])
+
+    def test_search_paginates_by_rank(self):
+        """Test the cursor pages follow the rank without repeats"""
+        chicken = Ingredient.objects.create(user=self.user, name='Chicken')
+        sample_recipe(self.user, 'Chicken soup')
+        sample_recipe(self.user, 'Chicken pie')
+        sample_recipe(self.user, 'Green curry', ingredients=[chicken])
+
+        titles, url = [], RECIPES_URL + '?search=chicken&page_size=1'
+        while url:
+            res = self.client.get(url)
+            titles += [recipe['title'] for recipe in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(titles, ['Chicken pie', 'Chicken soup',
+                                  'Green curry'])
+
+    def test_search_pages_equal_ranks_by_id(self):
+        """Test recipes of equal rank are paged by id, both ways"""
+        ids = [sample_recipe(self.user, 'Chicken soup').id for _ in range(7)]
+
+        pages, url = [], RECIPES_URL + '?search=chicken&page_size=3'
+        while url:
+            res = self.client.get(url)
+            pages.append(res.data)
+            url = res.data['next']
+
+        self.assertEqual(
+            [recipe['id'] for page in pages for recipe in page['results']],
+            ids[::-1]
+        )
+        res = self.client.get(pages[-1]['previous'])
+        self.assertEqual(res.data['results'], pages[-2]['results'])
+
+    def test_search_too_long(self):
+        """Test overly long searches are rejected"""
+        res = self.client.get(RECIPES_URL, {'search': 'a' * 201})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_fuzzy_title(self):
+        """Test a misspelled title is still found"""
+        if not has_trigram(DEFAULT_DB_ALIAS):
+            self.skipTest('needs pg_trgm')
+        sample_recipe(self.user, 'Spaghetti carbonara')
+
+        self.assertEqual(self.search('spagetti'), ['Spaghetti carbonara'])
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsApiTests(TestCase):
+    """Test the fields and expand parameters of recipe responses"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'sparse@test.com',
+            'pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Tofu'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Tofu scramble',
+            time_minutes=15,
+            price='6.00'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_list_fields(self):
+        """Test listing only some fields selects and prefetches less"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Tofu scramble'}]
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries[0]['sql'])
+        self.assertNotIn('"link"', queries[0]['sql'])
+
+    def test_list_fields_keeps_ordering_columns(self):
+        """Test the cursor column is loaded with sparse fields"""
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                RECIPES_URL,
+                {'fields': 'title', 'ordering': 'price', 'page_size': 1}
+            )
+
+        self.assertEqual(res.data['results'], [{'title': 'Tofu scramble'}])
+
+    def test_list_expand(self):
+        """Test expanded relations are nested objects"""
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'id,tags,ingredients', 'expand': 'tags'}
+        )
+
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+            'ingredients': [self.ingredient.id],
+        }])
+
+    def test_retrieve_fields(self):
+        """Test a detail limited to a relation only prefetches it"""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                {'fields': 'title,tags'}
+            )
+
+        self.assertEqual(res.data, {
+            'title': 'Tofu scramble',
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+        })
+
+    def test_etag_depends_on_fields(self):
+        """Test a sparse response is not validated for a full one"""
+        sparse = self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_NONE_MATCH=sparse['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], sparse['ETag'])
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown fields and relations are rejected"""
+        for params in ({'fields': 'id,secret'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
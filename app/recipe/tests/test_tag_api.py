@@ -42,7 +42,7 @@ class PrivateTagApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """test that tags returned are only for the authenticated user"""
@@ -52,8 +52,8 @@ class PrivateTagApiTest(TestCase):
         Tag.objects.create(user=user2, name='fruity')
         tag = Tag.objects.create(user=self.user, name='comfort food')
         res = self.client.get(TAGS_URL)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_create_tag_successful(self):
@@ -67,6 +67,17 @@ class PrivateTagApiTest(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_existing_tag_ignores_case(self):
+        """Test creating a tag named like an existing one returns it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertNumQueries(1):
+            res = self.client.post(TAGS_URL, {'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': tag.id, 'name': 'Vegan'})
+        self.assertEqual(Tag.objects.count(), 1)
+
     def test_create_tag_invalid(self):
         """test creating a tag with invalid payload"""
         payload = {'name': ''}
@@ -89,8 +100,8 @@ class PrivateTagApiTest(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags assigned return unique tags"""
@@ -113,4 +124,29 @@ class PrivateTagApiTest(TestCase):
         recipe2.tags.add(tag)
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_assigned_tags_paginated(self):
+        """Test that assigned only tags can be paged through"""
+        recipe = Recipe.objects.create(
+            title='Omelette',
+            time_minutes=5,
+            price=10,
+            user=self.user
+        )
+        for name in ('a', 'b', 'c'):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+        Tag.objects.create(user=self.user, name='unused')
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1, 'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        self.assertEqual(names, ['c', 'b', 'a'])
+        self.assertIsNone(res.data['next'])
+
+    def test_assigned_only_invalid(self):
+        """Test that an invalid assigned_only value is rejected"""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,162 @@
+import os
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageBlob, Recipe, UploadSession, \
+                        recipe_image_storage
+
+
+def uploads_url(recipe_id):
+    return reverse('recipe:recipe-uploads', args=[recipe_id])
+
+
+def upload_url(recipe_id, session_id):
+    return reverse('recipe:recipe-upload', args=[recipe_id, session_id])
+
+
+def finalize_url(recipe_id, session_id):
+    return reverse(
+        'recipe:recipe-upload-finalize',
+        args=[recipe_id, session_id]
+    )
+
+
+class ResumableUploadApiTests(TestCase):
+    """Test uploading recipe images in ranges"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'upload@test.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=30,
+            price=5
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), 'green').save(buffer, 'PNG')
+        self.content = buffer.getvalue()
+
+    def start(self, content):
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {'filename': 'photo.png', 'size': len(content)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def put_range(self, session_id, content, start, end):
+        return self.client.put(
+            upload_url(self.recipe.id, session_id),
+            content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(content)}'
+        )
+
+    def test_upload_in_ranges(self):
+        """Test an image uploaded in two ranges becomes the recipe image"""
+        session_id = self.start(self.content)
+        middle = len(self.content) // 2
+
+        res = self.put_range(session_id, self.content, 0, middle - 1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['offset'], middle)
+
+        res = self.client.get(upload_url(self.recipe.id, session_id))
+        self.assertEqual(res.data['offset'], middle)
+
+        size = len(self.content)
+        res = self.put_range(session_id, self.content, middle, size - 1)
+        self.assertEqual(res.data['offset'], size)
+
+        res = self.client.post(finalize_url(self.recipe.id, session_id))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open() as image:
+            self.assertEqual(image.read(), self.content)
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        self.assertEqual(
+            ImageBlob.objects.get(name=self.recipe.image.name).references,
+            1
+        )
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_range_must_start_at_offset(self):
+        """Test a range skipping bytes is refused with the current offset"""
+        session_id = self.start(self.content)
+
+        res = self.put_range(session_id, self.content, 10, 20)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 0)
+
+    def test_concurrent_range_refused(self):
+        """Test a range whose offset moved while it was written is refused"""
+        session_id = self.start(self.content)
+
+        def other_put(*args, **kwargs):
+            UploadSession.objects.filter(pk=session_id).update(received=10)
+            return makedirs(*args, **kwargs)
+
+        makedirs = os.makedirs
+        with patch('recipe.uploads.os.makedirs', side_effect=other_put):
+            res = self.put_range(session_id, self.content, 0, 9)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 10)
+
+    def test_finalize_incomplete_upload(self):
+        """Test an upload can only be finalized once complete"""
+        session_id = self.start(self.content)
+        self.put_range(session_id, self.content, 0, 9)
+
+        res = self.client.post(finalize_url(self.recipe.id, session_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(UploadSession.objects.exists())
+
+    def test_finalize_not_an_image(self):
+        """Test a file that is not an image is refused and discarded"""
+        content = b'not an image' * 10
+        session_id = self.start(content)
+        self.put_range(session_id, content, 0, len(content) - 1)
+        session = UploadSession.objects.get()
+
+        res = self.client.post(finalize_url(self.recipe.id, session_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(recipe_image_storage.exists(session.partial_name))
+
+    def test_upload_size_limited(self):
+        """Test sessions can not announce files over the limit"""
+        with self.settings(IMAGE_UPLOAD_MAX_SIZE=100):
+            res = self.client.post(
+                uploads_url(self.recipe.id),
+                {'filename': 'photo.png', 'size': 101}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('size', res.data)
@@ -0,0 +1,142 @@
+import os
+import re
+
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import Recipe, UploadSession, recipe_image_file_name, \
+                        recipe_image_storage
+from recipe.images import process_image
+
+UUID_PATTERN = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+CHUNK_SIZE = 64 * 1024
+
+# Pillow format -> extension of the accepted images
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+}
+
+
+class RangeConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('the range does not start at the upload offset')
+    default_code = 'range_conflict'
+
+    def __init__(self, offset):
+        super().__init__()
+        self.detail = {'detail': self.detail, 'offset': offset}
+
+
+def write_range(session, request):
+    """Write the body of a PUT at the range given by its Content-Range
+
+    Ranges have to follow each other, the first byte of a range being
+    the offset reached so far. They are written in place in the partial
+    file, which finalize renames into the storage without copying it.
+    No transaction is held while the body arrives, possibly over minutes:
+    the offset is advanced afterwards only if it is still the start of
+    the range, and a concurrent PUT that moved it first gets a 409.
+    Returns the new offset, which only counts the bytes actually
+    received if the client went away mid-range.
+    """
+    match = CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+    if not match:
+        raise ValidationError({'detail': _(
+            'expected a "Content-Range: bytes start-end/size" header'
+        )})
+    start, end, size = map(int, match.groups())
+    if size != session.size or not start <= end < size:
+        raise ValidationError({'detail': _('the range is outside the file')})
+    length = end - start + 1
+    if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+        raise ValidationError({'detail': _(
+            'the Content-Length does not match the range'
+        )})
+    if start != session.received:
+        raise RangeConflict(session.received)
+
+    path = recipe_image_storage.path(session.partial_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if start else 'wb') as partial:
+        partial.seek(start)
+        while written < length:
+            chunk = request.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            partial.write(chunk)
+            written += len(chunk)
+
+    updated = UploadSession.objects.filter(
+        pk=session.pk,
+        received=start
+    ).update(received=start + written)
+    if not updated:
+        session.refresh_from_db(fields=['received'])
+        raise RangeConflict(session.received)
+    return start + written
+
+
+def finalize(recipe, session_id):
+    """Make a complete upload the recipe's image and return the recipe
+
+    Only the header of the file is read to check that it is an image:
+    Pillow opens images lazily, the pixels are decoded by the image
+    worker. The session is deleted whether the file is valid or not.
+    """
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(),
+            recipe=recipe,
+            pk=session_id
+        )
+        if session.received != session.size:
+            raise ValidationError({'detail': _(
+                'the upload is incomplete, %(received)d of %(size)d bytes '
+                'were received'
+            ) % {'received': session.received, 'size': session.size}})
+
+        path = recipe_image_storage.path(session.partial_name)
+        extension = _image_extension(path)
+        if extension is not None:
+            recipe.image = recipe_image_storage.save_file(
+                path,
+                recipe_image_file_name(recipe, f'upload.{extension}')
+            )
+            recipe.image_status = Recipe.IMAGE_PROCESSING
+            recipe.image_queued = timezone.now()
+            recipe.save()
+            process_image(recipe)
+        session.delete()
+
+    if extension is None:
+        raise ValidationError({'image': [_(
+            'Upload a valid image. The file you uploaded was either not an '
+            'image or a corrupted image.'
+        )]})
+    return recipe
+
+
+def _image_extension(path):
+    """Return the extension of an accepted image, reading only its header"""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        return None
+    limit = Image.MAX_IMAGE_PIXELS
+    if limit and width * height > limit:
+        return None
+    return IMAGE_FORMATS.get(image_format)
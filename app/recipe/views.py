@@ -1,37 +1,71 @@
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import quote_etag
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, UploadSession
+from core.replicas import ReplicaReadMixin
 from recipe import serializers
+from recipe.bulk import BulkModelMixin, RecipeAttrBulkHandler, \
+                        RecipeBulkHandler
+from recipe.cache import CachedListMixin, conditional_response, \
+                         make_etag, set_validators
+from recipe.export import EXPORT_FORMATS, iter_recipes
+from recipe.filters import AssignedOnlyFilter, RecipeOrderingFilter, \
+                           RecipeRangeFilter, RecipeRelationFilter, \
+                           RecipeSearchFilter, parse_name_list
+from recipe.images import process_image
+from recipe.importer import PARSERS, RecipeImporter
+from recipe.rows import RowListMixin, row_serializer
+from recipe.pagination import RecipeCursorPagination, \
+                              RecipeAttrCursorPagination
+from recipe.uploads import UUID_PATTERN, finalize, write_range
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            CachedListMixin,
+                            RowListMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = (AssignedOnlyFilter,)
+    bulk_handler_class = RecipeAttrBulkHandler
 
     def get_queryset(self):
         """Return objects for the current authentticated user only"""
+        return self.queryset.filter(user=self.request.user).order_by('-name')
 
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+    def create(self, request, *args, **kwargs):
+        """Create an object, or return the one with the same name"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = self.perform_create(serializer)
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(serializer.data, status=code)
 
     def perform_create(self, serializer):
-        """Create a new object"""
-        serializer.save(user=self.request.user)
+        """Create a new object unless the name exists in any case"""
+        model = self.queryset.model
+        serializer.instance, created = model.objects.get_or_create_by_name(
+            self.request.user,
+            serializer.validated_data['name']
+        )
+        return created
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -46,36 +80,203 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication, )
+    bulk_handler_class = RecipeBulkHandler
+    bulk_serializer_class = serializers.RecipeBulkSerializer
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeCursorPagination
+    # RecipeOrderingFilter comes first, the pagination takes the ordering
+    # of the first backend with a get_ordering
+    filter_backends = (
+        RecipeOrderingFilter,
+        RecipeSearchFilter,
+        RecipeRelationFilter,
+        RecipeRangeFilter,
+    )
     queryset = Recipe.objects.all()
-
-    def _param_to_int(self, qs):
-        """Convert a list of string ids to list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    # the upload actions set 'upload', see core.throttling
+    throttle_scope = None
+    # the offset of an upload must be the one just written
+    primary_actions = ('upload',)
 
     def get_queryset(self):
         """retireve recipes only assigned to the authenticated user"""
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).defer('search_vector')
+        if self.action in ('update', 'partial_update'):
+            queryset = queryset.prefetch_related(*self._prefetch_lookups())
+        fields = self.get_sparse_fields()[0]
+        if fields is not None:
+            queryset = queryset.only(*self._columns(fields))
+        return queryset.order_by('-id')
+
+    def get_sparse_fields(self):
+        """Return the `fields` and `expand` requested for list and retrieve
+
+        `fields` is None when every field is wanted. The relations are
+        lists of ids unless expanded, retrieve always nests them.
+        """
+        if not hasattr(self, '_sparse_fields'):
+            fields, expand = None, ()
+            if self.action in ('list', 'retrieve'):
+                serializer_class = self.get_serializer_class()
+                params = self.request.query_params
+                if params.get('fields'):
+                    fields = parse_name_list(
+                        params['fields'],
+                        'fields',
+                        serializer_class.Meta.fields
+                    )
+                if params.get('expand'):
+                    expand = parse_name_list(
+                        params['expand'],
+                        'expand',
+                        tuple(serializer_class.expandable)
+                    )
+                    if fields is not None:
+                        expand = [name for name in expand if name in fields]
+            self._sparse_fields = fields, expand
+        return self._sparse_fields
+
+    def _columns(self, fields):
+        """Return the columns to load for the requested fields
+
+        The id, version and modified time make the validators, and the
+        ordering columns the cursor. Anything else would be loaded by a
+        query per recipe.
+        """
+        columns = {'id', 'version', 'modified'}
+        if self.action == 'list':
+            ordering = RecipeOrderingFilter().get_ordering(
+                self.request,
+                None,
+                self
+            )
+            columns.update(name.lstrip('-') for name in ordering)
+        columns.update(
+            fields if fields is not None
+            else self.get_serializer_class().Meta.fields
+        )
+        concrete = {
+            field.name for field in Recipe._meta.concrete_fields
+        }
+        return sorted(columns & concrete)
+
+    def get_serializer(self, *args, **kwargs):
+        """Limit the list and retrieve serializers to the sparse fields"""
+        if self.action in ('list', 'retrieve'):
+            fields, expand = self.get_sparse_fields()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def _prefetch_lookups(self):
+        """Return the relations the action's serializer reads
+
+        list and retrieve prefetch them only after the conditional request
+        check, so a 304 costs a single query. Relations left out of
+        `fields` are not prefetched, and list only loads the ids of the
+        ones not expanded.
+        """
+        fields, expand = self.get_sparse_fields()
+        lookups = []
+        for name, model in (('tags', Tag), ('ingredients', Ingredient)):
+            if fields is not None and name not in fields:
+                continue
+            if self.action == 'retrieve' or name in expand:
+                lookups.append(name)
+            else:
+                lookups.append(Prefetch(
+                    name,
+                    queryset=model.objects.only('id').order_by('id')
+                ))
+        return lookups
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, answering conditional requests before serializing
+
+        The ETag covers the ids and versions on the page and its links.
+        Last-Modified is informational only: a deleted recipe can change a
+        page without moving its newest modified time. Unless relations are
+        expanded, the page is read as `.values()` rows and serialized by
+        a RowSerializer.
+        """
+        fields, expand = self.get_sparse_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = not expand
+        if rows:
+            queryset = queryset.values(
+                *self._columns(fields),
+                *queryset.query.annotations
+            )
+            value = dict.__getitem__
+        else:
+            value = getattr
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            # pagination is off, the whole list is one page without links
+            items, links = list(queryset), (None, None)
+        else:
+            items, links = page, (
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link(),
+            )
+        etag = make_etag((
+            [(value(recipe, 'id'), value(recipe, 'version'))
+             for recipe in items],
+            *links,
+            self.get_sparse_fields(),
+        ))
+        response = conditional_response(request, etag)
+        if response is None:
+            if rows:
+                data = row_serializer(
+                    self.get_serializer_class()
+                ).serialize(items, fields)
+            else:
+                prefetch_related_objects(items, *self._prefetch_lookups())
+                data = self.get_serializer(items, many=True).data
+            if page is None:
+                response = Response(data)
+            else:
+                response = self.get_paginated_response(data)
+            last_modified = max(
+                (value(recipe, 'modified') for recipe in items),
+                default=None
+            )
+            set_validators(response, etag, last_modified)
+        return response
 
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._param_to_int(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._param_to_int(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering conditional requests first"""
+        instance = self.get_object()
+        etag = quote_etag(f'{instance.id}-{instance.version}')
+        if self.get_sparse_fields() != (None, ()):
+            etag = make_etag((instance.id, instance.version,
+                              self.get_sparse_fields()))
+        response = conditional_response(request, etag, instance.modified)
+        if response is None:
+            prefetch_related_objects([instance], *self._prefetch_lookups())
+            response = Response(self.get_serializer(instance).data)
+            set_validators(response, etag, instance.modified)
+        return response
+
+    def get_bulk_response_data(self, recipes):
+        """Serialize the bulk written recipes with their ids prefetched"""
+        prefetch_related_objects(recipes, *self._prefetch_lookups())
+        return super().get_bulk_response_data(recipes)
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'finalize_upload'):
             return serializers.RecipeImageSerializer
         return self.serializer_class
 
@@ -83,9 +284,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Crearte a recipe"""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload_image')
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'output': f'expected one of {", ".join(EXPORT_FORMATS)}'}
+            )
+        render, content_type = EXPORT_FORMATS[output]
+        queryset = self.filter_queryset(self.get_queryset())
+        # the rows are streamed after dispatch() has routed reads back to
+        # the primary, keep reading from the database chosen for now
+        recipes = iter_recipes(
+            queryset.using(queryset.db),
+            settings.EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            render(recipes),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='import',
+            url_name='import', parser_classes=(MultiPartParser,))
+    def import_recipes(self, request):
+        """Import recipes from an uploaded NDJSON or CSV file"""
+        upload = request.data.get('file')
+        if not upload:
+            raise ValidationError({'file': 'No file was submitted.'})
+        default = 'csv' if upload.name.endswith('.csv') else 'ndjson'
+        input_format = request.data.get('input', default)
+        if input_format not in PARSERS:
+            raise ValidationError(
+                {'input': f'expected one of {", ".join(PARSERS)}'}
+            )
+
+        result = RecipeImporter(request.user).run(
+            PARSERS[input_format](upload)
+        )
+        code = status.HTTP_201_CREATED if result.imported else \
+            status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=code)
+
+    @action(methods=['POST'], detail=True, url_path='upload_image',
+            throttle_scope='upload')
     def upload_image(self, request, pk=None):
-        """upload an image to a recipe"""
+        """upload an image to a recipe, its variants are rendered later"""
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -93,13 +340,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(
+                image_status=Recipe.IMAGE_PROCESSING,
+                image_queued=timezone.now()
+            )
+            process_image(recipe)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=True, url_path='uploads',
+            url_name='uploads', throttle_scope='upload')
+    def create_upload(self, request, pk=None):
+        """Start a resumable upload of the recipe image"""
+        recipe = self.get_object()
+        serializer = serializers.UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user, recipe=recipe)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET', 'PUT', 'DELETE'], detail=True,
+            url_path=f'uploads/(?P<session_id>{UUID_PATTERN})',
+            url_name='upload', throttle_scope='upload')
+    def upload(self, request, pk=None, session_id=None):
+        """Report the offset of an upload, write a range or abort it
+
+        PUT writes the body at the position of its Content-Range header.
+        """
+        session = get_object_or_404(
+            UploadSession,
+            recipe=self.get_object(),
+            pk=session_id
+        )
+        if request.method == 'DELETE':
+            session.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PUT':
+            session.received = write_range(session, request)
+        serializer = serializers.UploadSessionSerializer(session)
+        return Response(serializer.data)
+
+    @action(methods=['POST'], detail=True,
+            url_path=f'uploads/(?P<session_id>{UUID_PATTERN})/finalize',
+            url_name='upload-finalize', throttle_scope='upload')
+    def finalize_upload(self, request, pk=None, session_id=None):
+        """Use a complete upload as the recipe image"""
+        recipe = finalize(self.get_object(), session_id)
+        serializer = self.get_serializer(recipe)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
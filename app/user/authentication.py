@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Token keys to users with a TTL, in a shared cache or this process
+
+    Entries hold the user's field values rather than a model instance, so
+    every request gets its own user object. The password hash is left
+    out (it is loaded on access like any deferred field). When
+    TOKEN_AUTH_SHARED_CACHE names a cache alias, entries live there only:
+    an invalidation made by one process then applies to all of them at
+    once. Otherwise they are kept in a bounded LRU of the process, only
+    when TOKEN_AUTH_LOCAL_CACHE says a single process serves the API:
+    other processes would accept a revoked token until it expires.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        alias = settings.TOKEN_AUTH_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        """Return the (user, token) of a key, or None when not cached"""
+        shared = self.shared
+        if shared:
+            values = shared.get(_shared_key(key))
+            return None if values is None else _build(key, values)
+        if not settings.TOKEN_AUTH_LOCAL_CACHE:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return _build(key, entry[1])
+
+    def set(self, key, user, token):
+        """Cache the user and token of a key"""
+        values = (
+            tuple(getattr(user, name) for name in _user_fields()),
+            token.created
+        )
+        shared = self.shared
+        if shared:
+            shared.set(
+                _shared_key(key),
+                values,
+                settings.TOKEN_AUTH_CACHE_TTL
+            )
+        elif settings.TOKEN_AUTH_LOCAL_CACHE:
+            self._store(key, values, time.monotonic())
+
+    def delete(self, key):
+        """Forget a key, locally and in the shared cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self.shared
+        if shared:
+            shared.delete(_shared_key(key))
+
+    def clear(self):
+        """Forget every locally cached key"""
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, values, now):
+        with self._lock:
+            self._entries[key] = (now + settings.TOKEN_AUTH_CACHE_TTL, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+def _user_fields():
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def _shared_key(key):
+    # the raw token never leaves the process
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _build(key, values):
+    user_values, created = values
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS,
+        _user_fields(),
+        user_values
+    )
+    token = Token(key=key, user=user, created=created)
+    token._state.adding = False
+    return user, token
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token query for known tokens
+
+    Entries are dropped when the token is deleted or its user is saved,
+    see user.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+            return user, token
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, token
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashPoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('too many logins in progress, retry shortly')
+    default_code = 'hash_pool_busy'
+
+
+class HashPool:
+    """Bounded pool of threads computing password hashes
+
+    At most `max_pending` hashes are queued or running in the process;
+    a caller waiting longer than `wait` seconds for a slot gets
+    HashPoolBusy (503) instead of piling up behind a login storm. The
+    hash functions release the GIL, so `workers` also caps the CPU the
+    process spends on logins.
+    """
+
+    def __init__(self, workers, max_pending, wait):
+        self.executor = ThreadPoolExecutor(
+            workers,
+            thread_name_prefix='password-hash'
+        )
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.wait = wait
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.wait):
+            raise HashPoolBusy
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """Return the process' hash pool, started on first use"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = HashPool(
+                settings.PASSWORD_HASH_WORKERS,
+                settings.PASSWORD_HASH_MAX_PENDING,
+                settings.PASSWORD_HASH_WAIT
+            )
+        return _hash_pool
+
+
+def verify_password(password, encoded):
+    """Check a password, returning (is_correct, upgraded hash or None)
+
+    The upgraded hash is computed when the password is correct but was
+    hashed with another hasher or other parameters than the preferred
+    ones. Touches no model, so it can run in the hash pool.
+    """
+    upgraded = []
+    is_correct = check_password(
+        password,
+        encoded,
+        setter=lambda raw: upgraded.append(make_password(raw))
+    )
+    return is_correct, upgraded[0] if upgraded else None
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend computing password hashes in the bounded hash pool
+
+    Only the hashing runs in the pool, the queries and the save of an
+    upgraded hash stay in the request thread and its transaction.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        pool = get_hash_pool()
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # hash anyway so that unknown users take as long as known ones
+            pool.run(make_password, password)
+            return None
+
+        is_correct, upgraded = pool.run(
+            verify_password,
+            password,
+            user.password
+        )
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,99 @@
+import os
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from rest_framework.test import APIRequestFactory
+
+from user.views import CreateTokenView
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    """Measure what a login costs with the configured password hashers"""
+    help = 'Measure password checks and token logins per second per core'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{os.cpu_count()} cores')
+        for hasher in get_hashers():
+            self.bench_hasher(hasher, options['runs'])
+        self.bench_logins(options['logins'], options['threads'])
+
+    def bench_hasher(self, hasher, runs):
+        """Time verifying a password on one thread"""
+        try:
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+        except ValueError as exc:
+            self.stdout.write(f'{hasher.algorithm}: skipped, {exc}')
+            return
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            hasher.verify(PASSWORD, encoded)
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        self.stdout.write(
+            f'{hasher.algorithm}: {median * 1000:.1f} ms per check, '
+            f'{1 / median:.1f} checks/s per core'
+        )
+
+    def bench_logins(self, logins, threads):
+        """POST to the token view from concurrent threads
+
+        The user is committed so that every thread's connection sees it,
+        and deleted at the end.
+        """
+        user = get_user_model().objects.create_user(
+            f'bench-{time.time_ns()}@example.com',
+            PASSWORD
+        )
+        view = CreateTokenView.as_view()
+        statuses = []
+        lock = threading.Lock()
+
+        def login(count):
+            factory = APIRequestFactory()
+            try:
+                for _ in range(count):
+                    res = view(factory.post(
+                        '/',
+                        {'email': user.email, 'password': PASSWORD}
+                    ))
+                    with lock:
+                        statuses.append(res.status_code)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=login, args=(logins // threads,))
+            for _ in range(threads)
+        ]
+        try:
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            seconds = time.perf_counter() - started
+        finally:
+            user.delete()
+
+        ok = statuses.count(200)
+        busy = statuses.count(503)
+        cores = min(threads, os.cpu_count())
+        self.stdout.write(
+            f'token view: {ok} logins in {seconds:.2f}s on {threads} '
+            f'threads, {ok / seconds:.1f} logins/s, '
+            f'{ok / seconds / cores:.1f} logins/s per core, {busy} busy'
+        )
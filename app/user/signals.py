@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+def _forget(keys):
+    """Drop cached tokens now and again once the transaction commits
+
+    The second pass covers a request that cached the old row between
+    the write and the commit.
+    """
+    keys = list(keys)
+    for key in keys:
+        token_cache.delete(key)
+    transaction.on_commit(lambda: [token_cache.delete(key) for key in keys])
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token"""
+    _forget([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_changed_user(sender, instance, created, **kwargs):
+    """Drop the cached copies of a user that changed or was deactivated"""
+    if not created:
+        _forget(Token.objects.filter(user=instance).values_list(
+            'key',
+            flat=True
+        ))
@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, TokenCache, \
+                                token_cache
+
+ME_URL = reverse('user:me')
+
+
+@override_settings(TOKEN_AUTH_LOCAL_CACHE=True)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching the token lookups of authenticated requests"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = get_user_model().objects.create_user(
+            'cached@test.com',
+            'pass123',
+            name='Cached'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test only the first request queries the token"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    @override_settings(TOKEN_AUTH_LOCAL_CACHE=False)
+    def test_not_cached_without_single_process(self):
+        """Test tokens are not cached per process unless it is the only one"""
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cached_users_are_copies(self):
+        """Test each request gets its own user object"""
+        authentication = CachedTokenAuthentication()
+        first, token = authentication.authenticate_credentials(self.token.key)
+        first.name = 'Changed'
+        second, token = authentication.authenticate_credentials(
+            self.token.key
+        )
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, 'Cached')
+        self.assertEqual(token.user_id, self.user.id)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating at once"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating at once"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cache(self):
+        """Test changes made through the profile endpoint are seen"""
+        self.client.patch(ME_URL, {'name': 'Renamed', 'password': 'new123'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Renamed')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new123'))
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=1)
+    def test_cache_bounded(self):
+        """Test the least recently used token is evicted"""
+        other = get_user_model().objects.create_user('other@test.com', 'pw')
+        other_token = Token.objects.create(user=other)
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        authentication.authenticate_credentials(other_token.key)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(other_token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=-1)
+    def test_cache_expires(self):
+        """Test entries older than the ttl are not used"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache(self):
+        """Test a process with a cold cache reads the shared cache"""
+        cache.clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache_revocation(self):
+        """Test a token revoked by one process is rejected by the others"""
+        cache.clear()
+        other_process = TokenCache()
+        other_process.set(self.token.key, self.user, self.token)
+        self.assertIsNotNone(other_process.get(self.token.key))
+
+        token_cache.delete(self.token.key)
+
+        self.assertIsNone(other_process.get(self.token.key))
+        self.token.delete()
+        with patch('user.authentication.token_cache', other_process):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,91 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.backends import HashPool, HashPoolBusy
+
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashingTests(TestCase):
+    """Test the password hashers and the pooled login backend"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_upgrades_hash(self):
+        """Test a hash with outdated parameters is upgraded on login"""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                'hash@test.com',
+                'pass123'
+            )
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': 'hash@test.com', 'password': 'pass123'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_wrong_password_not_upgraded(self):
+        """Test a failed login leaves the hash alone"""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                'hash@test.com',
+                'pass123'
+            )
+        encoded = user.password
+
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'hash@test.com', 'password': 'wrong'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        user.refresh_from_db()
+        self.assertEqual(user.password, encoded)
+
+    def test_hash_pool_busy(self):
+        """Test callers get HashPoolBusy when every slot stays taken"""
+        pool = HashPool(workers=1, max_pending=1, wait=0.01)
+        started, release = threading.Event(), threading.Event()
+
+        def hold():
+            started.set()
+            release.wait()
+
+        holder = threading.Thread(target=pool.run, args=(hold,))
+        holder.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashPoolBusy):
+                pool.run(len, 'x')
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(pool.run(len, 'x'), 1)
+
+    def test_busy_pool_returns_503(self):
+        """Test a saturated hash pool fails logins with a 503"""
+        get_user_model().objects.create_user('hash@test.com', 'pass123')
+        pool = HashPool(workers=1, max_pending=1, wait=0)
+        pool.slots.acquire()
+
+        with patch('user.backends.get_hash_pool', return_value=pool):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': 'hash@test.com', 'password': 'pass123'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)